@@ -0,0 +1,280 @@
+import argparse
+import csv
+import glob
+import json
+import math
+import os
+import platform
+import statistics
+import sys
+import time
+
+from cvrp import CVRP, CONSTRUCCION_AHORROS, CONSTRUCCION_BARRIDO, CONSTRUCCION_VECINO_ALEATORIO, MOTIVO_OBJETIVO
+from cvrp_instance import read_cvrp_instance
+from genetico import busqueda_genetica_hibrida
+from instance_binary import BINARY_EXTENSION, load_instance_binary
+from lns import busqueda_vecindario_grande
+from metaheuristicas import busqueda_local_iterada, recocido_simulado
+from multiarranque import semillas_arranques
+from tabu import busqueda_tabu
+
+INSTANCE_EXTENSIONS = (".txt", ".vrp", ".vrp.gz", ".txt.gz", BINARY_EXTENSION)
+
+METODO_RESOLVER = "resolver"
+# Métodos de mejora que continúan desde la solución de resolver (todos con la misma firma)
+METAHEURISTICAS = {
+    "ils": busqueda_local_iterada,
+    "recocido": recocido_simulado,
+    "genetico": busqueda_genetica_hibrida,
+    "tabu": busqueda_tabu,
+    "lns": busqueda_vecindario_grande,
+}
+METODOS = (METODO_RESOLVER,) + tuple(METAHEURISTICAS)
+
+# Márgenes por defecto para dar por empeorado un resultado frente a la referencia
+TOLERANCIA_GAP = 0.5  # puntos porcentuales de gap medio
+TOLERANCIA_TIEMPO = 20.0  # % de tiempo medio
+
+SUMMARY_FIELDS = ("instance", "dimension", "optimal_value", "runs", "best_cost", "mean_cost", "best_gap",
+                  "mean_gap", "mean_time", "max_time", "target_hits", "mean_time_to_target")
+
+
+def expand_instance_paths(patterns):
+    """
+    Expande directorios y patrones glob a la lista ordenada de ficheros de instancias.
+    """
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            candidates = glob.glob(os.path.join(pattern, "*"))
+        else:
+            candidates = glob.glob(pattern) or [pattern]
+        paths.extend(path for path in candidates if path.endswith(INSTANCE_EXTENSIONS))
+    return sorted(set(paths))
+
+
+def load_instance(path):
+    if path.endswith(BINARY_EXTENSION):
+        return load_instance_binary(path)
+    return read_cvrp_instance(path)
+
+
+def gap(cost, optimal_value):
+    # Gap en % respecto al valor óptimo de la instancia (NaN si no se conoce)
+    if not optimal_value:
+        return math.nan
+    return 100.0 * (cost - optimal_value) / optimal_value
+
+
+def ejecutar_configuracion(instance, semilla, metodo=METODO_RESOLVER, k_vecinos=None,
+                           construccion=CONSTRUCCION_VECINO_ALEATORIO, tiempo_limite=None, iteraciones=None,
+                           objetivo=None):
+    """
+    Resuelve una instancia con una configuración y una semilla.
+
+    Con metodo distinto de resolver, la metaheurística continúa desde la solución
+    de resolver y ambas comparten tiempo_limite. Si se da objetivo, la búsqueda se
+    detiene al alcanzarlo y el tiempo de esa ejecución es el tiempo hasta el objetivo.
+
+    Returns:
+        Diccionario con el coste, el número de rutas, el tiempo y el motivo de parada.
+    """
+    demandas = instance.demand_array.tolist() if instance.demand_array is not None else list(instance.demands.values())
+    inicio = time.perf_counter()
+    solver = CVRP(instance.distance_matrix, demandas, instance.capacity, k_vecinos=k_vecinos,
+                  construccion=construccion, coordenadas=instance.coords, semilla=semilla)
+    solver.resolver(tiempo_limite=tiempo_limite, objetivo=objetivo)
+    if metodo != METODO_RESOLVER and solver.motivo_parada != MOTIVO_OBJETIVO:
+        restante = None if tiempo_limite is None else max(tiempo_limite - (time.perf_counter() - inicio), 0)
+        METAHEURISTICAS[metodo](solver, iteraciones=iteraciones, tiempo_limite=restante, objetivo=objetivo)
+    tiempo = time.perf_counter() - inicio
+    return {
+        "seed": semilla,
+        "cost": solver.coste_total(),
+        "routes": len(solver.rutas),
+        "time": tiempo,
+        "stop_reason": solver.motivo_parada,
+        "time_to_target": tiempo if solver.motivo_parada == MOTIVO_OBJETIVO else None,
+    }
+
+
+def resumir(nombre, instance, ejecuciones):
+    costes = [ejecucion["cost"] for ejecucion in ejecuciones]
+    tiempos = [ejecucion["time"] for ejecucion in ejecuciones]
+    tiempos_objetivo = [ejecucion["time_to_target"] for ejecucion in ejecuciones
+                        if ejecucion["time_to_target"] is not None]
+    return {
+        "instance": nombre,
+        "dimension": instance.dimension,
+        "optimal_value": instance.optimal_value,
+        "runs": len(ejecuciones),
+        "best_cost": min(costes),
+        "mean_cost": statistics.fmean(costes),
+        "best_gap": gap(min(costes), instance.optimal_value),
+        "mean_gap": gap(statistics.fmean(costes), instance.optimal_value),
+        "mean_time": statistics.fmean(tiempos),
+        "max_time": max(tiempos),
+        "target_hits": len(tiempos_objetivo),
+        "mean_time_to_target": statistics.fmean(tiempos_objetivo) if tiempos_objetivo else None,
+    }
+
+
+def ejecutar_benchmark(paths, seeds=5, base_seed=0, gap_objetivo=None, **configuracion):
+    """
+    Ejecuta una configuración sobre varias instancias y semillas.
+
+    Args:
+        paths: Ficheros de instancias.
+        seeds: Número de semillas por instancia (derivadas de base_seed).
+        base_seed: Semilla base.
+        gap_objetivo: Si se da, cada ejecución se detiene al llegar a optimal_value * (1 + gap_objetivo / 100).
+        **configuracion: Argumentos de ejecutar_configuracion (metodo, k_vecinos, tiempo_limite...).
+
+    Returns:
+        Diccionario con la configuración, el entorno, las ejecuciones y el resumen por instancia.
+    """
+    semillas = semillas_arranques(base_seed, seeds)
+    ejecuciones = []
+    resumen = []
+    for path in paths:
+        instance = load_instance(path)
+        nombre = instance.name or os.path.basename(path)
+        objetivo = None
+        if gap_objetivo is not None and instance.optimal_value:
+            objetivo = instance.optimal_value * (1 + gap_objetivo / 100.0)
+        resultados = []
+        for semilla in semillas:
+            resultado = ejecutar_configuracion(instance, semilla, objetivo=objetivo, **configuracion)
+            resultado["instance"] = nombre
+            resultado["gap"] = gap(resultado["cost"], instance.optimal_value)
+            resultados.append(resultado)
+        ejecuciones.extend(resultados)
+        resumen.append(resumir(nombre, instance, resultados))
+    return {
+        "config": dict(configuracion, seeds=seeds, base_seed=base_seed, target_gap=gap_objetivo),
+        "environment": {"python": platform.python_version(), "machine": platform.machine(),
+                        "processor": platform.processor(), "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")},
+        "runs": ejecuciones,
+        "summary": resumen,
+    }
+
+
+def comparar_con_referencia(resultados, referencia, tolerancia_gap=TOLERANCIA_GAP,
+                            tolerancia_tiempo=TOLERANCIA_TIEMPO):
+    """
+    Compara el resumen por instancia con el de una ejecución de referencia.
+
+    Una instancia empeora si su gap medio sube más de tolerancia_gap puntos (o, sin
+    valor óptimo, su coste medio sube más de tolerancia_gap %) o si su tiempo medio
+    sube más de tolerancia_tiempo %.
+
+    Returns:
+        Lista de diccionarios (uno por instancia común) con las diferencias y los motivos de empeoramiento.
+    """
+    anteriores = {fila["instance"]: fila for fila in referencia["summary"]}
+    comparacion = []
+    for fila in resultados["summary"]:
+        anterior = anteriores.get(fila["instance"])
+        if anterior is None:
+            continue
+        diferencias = {
+            "instance": fila["instance"],
+            "mean_cost": fila["mean_cost"],
+            "baseline_mean_cost": anterior["mean_cost"],
+            "mean_time": fila["mean_time"],
+            "baseline_mean_time": anterior["mean_time"],
+            "regressions": [],
+        }
+        if fila["optimal_value"] and anterior.get("mean_gap") is not None:
+            if fila["mean_gap"] - anterior["mean_gap"] > tolerancia_gap:
+                diferencias["regressions"].append("gap")
+        elif fila["mean_cost"] > anterior["mean_cost"] * (1 + tolerancia_gap / 100.0):
+            diferencias["regressions"].append("cost")
+        if fila["mean_time"] > anterior["mean_time"] * (1 + tolerancia_tiempo / 100.0):
+            diferencias["regressions"].append("time")
+        comparacion.append(diferencias)
+    return comparacion
+
+
+def escribir_csv(resumen, path):
+    with open(path, "w", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=SUMMARY_FIELDS)
+        writer.writeheader()
+        writer.writerows(resumen)
+
+
+def escribir_json(resultados, path):
+    # NaN no es JSON válido: los gaps desconocidos se guardan como null
+    with open(path, "w") as file:
+        json.dump(_sin_nan(resultados), file, indent=2)
+
+
+def _sin_nan(valor):
+    if isinstance(valor, float) and math.isnan(valor):
+        return None
+    if isinstance(valor, dict):
+        return {clave: _sin_nan(v) for clave, v in valor.items()}
+    if isinstance(valor, list):
+        return [_sin_nan(v) for v in valor]
+    return valor
+
+
+def imprimir_resumen(resumen, comparacion=None):
+    por_instancia = {fila["instance"]: fila for fila in comparacion or []}
+    print(f"{'Instancia':<16}{'Óptimo':>9}{'Mejor':>11}{'Media':>11}{'Gap mejor':>11}{'Gap medio':>11}"
+          f"{'Tiempo':>9}{'Objetivo':>10}")
+    for fila in resumen:
+        tiempo_objetivo = fila["mean_time_to_target"]
+        print(f"{fila['instance']:<16}{fila['optimal_value']:>9}{fila['best_cost']:>11.1f}{fila['mean_cost']:>11.1f}"
+              f"{fila['best_gap']:>10.2f}%{fila['mean_gap']:>10.2f}%{fila['mean_time']:>8.2f}s"
+              f"{'-' if tiempo_objetivo is None else f'{tiempo_objetivo:.2f}s':>10}")
+        diferencias = por_instancia.get(fila["instance"])
+        if diferencias is not None and diferencias["regressions"]:
+            print(f"  Empeora frente a la referencia ({', '.join(diferencias['regressions'])}): "
+                  f"coste medio {diferencias['baseline_mean_cost']:.1f} -> {diferencias['mean_cost']:.1f}, "
+                  f"tiempo medio {diferencias['baseline_mean_time']:.2f}s -> {diferencias['mean_time']:.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ejecuta el solver sobre un conjunto de instancias y varias semillas")
+    parser.add_argument("paths", nargs="+", help="Directorios, ficheros o patrones glob, p. ej. 'instances/*.txt'")
+    parser.add_argument("--metodo", choices=METODOS, default=METODO_RESOLVER, help="Método de resolución")
+    parser.add_argument("--construccion", default=CONSTRUCCION_VECINO_ALEATORIO,
+                        choices=(CONSTRUCCION_VECINO_ALEATORIO, CONSTRUCCION_AHORROS, CONSTRUCCION_BARRIDO))
+    parser.add_argument("--k-vecinos", type=int, help="Vecindario granular de k vecinos")
+    parser.add_argument("--tiempo-limite", type=float, help="Segundos por ejecución")
+    parser.add_argument("--iteraciones", type=int, help="Iteraciones de la metaheurística")
+    parser.add_argument("--semillas", type=int, default=5, help="Ejecuciones por instancia")
+    parser.add_argument("--semilla", type=int, default=0, help="Semilla base")
+    parser.add_argument("--gap-objetivo", type=float,
+                        help="Detener cada ejecución al llegar a este gap (%%) y medir el tiempo hasta el objetivo")
+    parser.add_argument("--csv", help="Fichero CSV para el resumen por instancia")
+    parser.add_argument("--json", help="Fichero JSON con la configuración, las ejecuciones y el resumen")
+    parser.add_argument("--referencia", help="JSON de una ejecución anterior con el que comparar")
+    parser.add_argument("--tolerancia-gap", type=float, default=TOLERANCIA_GAP,
+                        help="Puntos de gap medio que se toleran frente a la referencia")
+    parser.add_argument("--tolerancia-tiempo", type=float, default=TOLERANCIA_TIEMPO,
+                        help="%% de tiempo medio que se tolera frente a la referencia")
+    args = parser.parse_args()
+
+    paths = expand_instance_paths(args.paths)
+    if not paths:
+        parser.error("No se ha encontrado ninguna instancia")
+    if args.metodo != METODO_RESOLVER and args.iteraciones is None and args.tiempo_limite is None:
+        parser.error(f"--metodo {args.metodo} necesita --iteraciones o --tiempo-limite")
+    resultados = ejecutar_benchmark(paths, seeds=args.semillas, base_seed=args.semilla, gap_objetivo=args.gap_objetivo,
+                                    metodo=args.metodo, k_vecinos=args.k_vecinos, construccion=args.construccion,
+                                    tiempo_limite=args.tiempo_limite, iteraciones=args.iteraciones)
+    comparacion = None
+    if args.referencia:
+        with open(args.referencia) as file:
+            comparacion = comparar_con_referencia(resultados, json.load(file), args.tolerancia_gap,
+                                                  args.tolerancia_tiempo)
+        resultados["comparison"] = comparacion
+    imprimir_resumen(resultados["summary"], comparacion)
+    if args.csv:
+        escribir_csv(resultados["summary"], args.csv)
+    if args.json:
+        escribir_json(resultados, args.json)
+    if comparacion and any(diferencias["regressions"] for diferencias in comparacion):
+        sys.exit(1)
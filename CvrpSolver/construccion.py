@@ -0,0 +1,292 @@
+import heapq
+import random
+
+import numpy as np
+
+from distance_matrix import nearest_neighbors, pair_distances
+
+# Por encima de este número de clientes los ahorros se restringen a listas de vecinos
+MAX_CLIENTES_AHORROS_DENSOS = 500
+K_VECINOS_AHORROS = 40
+# Longitud de las listas de vecinos ordenadas que usa el vecino más cercano
+K_VECINOS_CONSTRUCCION = 64
+
+# Las funciones de este módulo trabajan con índices de la matriz (desde 0, depósito = 0)
+# y devuelven las rutas con la numeración del solver: nodos desde 1 y el depósito (1) en ambos extremos.
+
+
+def vecinos_a_indices(vecinos):
+    # Listas de vecinos de CVRP (nodos desde 1, fila 0 = depósito) a un array de índices desde 0 por cliente
+    return np.asarray(vecinos[1:], dtype=np.int64) - 1
+
+
+def calcular_ahorros(distancias, vecinos=None):
+    """
+    Calcula de una vez los ahorros s(i, j) = d(0, i) + d(0, j) - d(i, j) positivos.
+
+    Args:
+        distancias: Matriz de distancias (ndarray, memmap, lista de listas o DistanceOracle).
+        vecinos: Listas de vecinos de CVRP, o None para usar todas las parejas de clientes.
+
+    Returns:
+        Tupla (ahorros, filas, columnas) de numpy.ndarray, con filas < columnas (índices desde 0).
+    """
+    num_nodos = len(distancias)
+    if vecinos is None and (num_nodos - 1 > MAX_CLIENTES_AHORROS_DENSOS or hasattr(distancias, "pairs")):
+        vecinos_indices = nearest_neighbors(distancias, K_VECINOS_AHORROS + 1)[1:]
+    elif vecinos is not None:
+        vecinos_indices = vecinos_a_indices(vecinos)
+    else:
+        vecinos_indices = None
+
+    if vecinos_indices is None:
+        filas, columnas = np.triu_indices(num_nodos - 1, 1)
+        filas += 1
+        columnas += 1
+    else:
+        origen = np.repeat(np.arange(1, num_nodos), vecinos_indices.shape[1])
+        destino = vecinos_indices.ravel()
+        validos = destino != 0
+        menor = np.minimum(origen[validos], destino[validos])
+        mayor = np.maximum(origen[validos], destino[validos])
+        pares = np.unique(menor * num_nodos + mayor)
+        filas, columnas = pares // num_nodos, pares % num_nodos
+
+    clientes = np.arange(1, num_nodos)
+    al_deposito = np.zeros(num_nodos)
+    al_deposito[1:] = pair_distances(distancias, np.zeros_like(clientes), clientes)
+    ahorros = al_deposito[filas] + al_deposito[columnas] - pair_distances(distancias, filas, columnas)
+    positivos = ahorros > 0
+    return ahorros[positivos], filas[positivos], columnas[positivos]
+
+
+def construir_ahorros(distancias, demandas, capacidad, vecinos=None):
+    """
+    Construcción de Clarke y Wright (versión paralela).
+
+    Los ahorros se procesan de mayor a menor desde un montículo. Cada ruta se
+    sigue con una estructura union-find con su carga, y sólo se unen dos rutas
+    distintas por clientes que todavía son extremos (grado < 2).
+
+    Args:
+        distancias: Matriz de distancias.
+        demandas: Demanda de cada nodo (índices desde 0).
+        capacidad: Capacidad del vehículo.
+        vecinos: Listas de vecinos de CVRP para restringir los ahorros, o None.
+
+    Returns:
+        Lista de rutas (listas de nodos desde 1, con el depósito en los extremos).
+    """
+    ahorros, filas, columnas = calcular_ahorros(distancias, vecinos)
+    monticulo = list(zip((-ahorros).tolist(), filas.tolist(), columnas.tolist()))
+    heapq.heapify(monticulo)
+
+    num_nodos = len(distancias)
+    padre = list(range(num_nodos))
+    carga = [int(demanda) for demanda in demandas]
+    grado = [0] * num_nodos
+    enlaces = [[] for _ in range(num_nodos)]
+
+    def raiz(nodo):
+        while padre[nodo] != nodo:
+            padre[nodo] = padre[padre[nodo]]
+            nodo = padre[nodo]
+        return nodo
+
+    while monticulo:
+        _, i, j = heapq.heappop(monticulo)
+        if grado[i] == 2 or grado[j] == 2:
+            continue
+        raiz_i, raiz_j = raiz(i), raiz(j)
+        if raiz_i == raiz_j or carga[raiz_i] + carga[raiz_j] > capacidad:
+            continue
+        enlaces[i].append(j)
+        enlaces[j].append(i)
+        grado[i] += 1
+        grado[j] += 1
+        padre[raiz_j] = raiz_i
+        carga[raiz_i] += carga[raiz_j]
+
+    return rutas_desde_enlaces(enlaces, grado)
+
+
+def rutas_desde_enlaces(enlaces, grado):
+    # Recorre cada cadena de clientes desde uno de sus extremos
+    visitado = [False] * len(enlaces)
+    rutas = []
+    for cliente in range(1, len(enlaces)):
+        if visitado[cliente] or grado[cliente] == 2:
+            continue
+        ruta = [1]
+        anterior, actual = -1, cliente
+        while actual != -1:
+            visitado[actual] = True
+            ruta.append(actual + 1)
+            siguiente = -1
+            for vecino in enlaces[actual]:
+                if vecino != anterior:
+                    siguiente = vecino
+            anterior, actual = actual, siguiente
+        ruta.append(1)
+        rutas.append(ruta)
+    return rutas
+
+
+def construir_barrido(coordenadas, distancias, demandas, capacidad, rotaciones=8):
+    """
+    Construcción por barrido angular alrededor del depósito.
+
+    Los clientes se ordenan por su ángulo polar (una sola llamada a NumPy) y la
+    secuencia se corta en rutas que respetan la capacidad. Se prueban varias
+    rotaciones del punto de inicio del barrido y se devuelve la de menor coste,
+    evaluando todas a la vez con sólo O(n) distancias.
+
+    Args:
+        coordenadas: numpy.ndarray (n, 2) con las coordenadas; la fila 0 es el depósito.
+        distancias: Matriz de distancias.
+        demandas: Demanda de cada nodo (índices desde 0).
+        capacidad: Capacidad del vehículo.
+        rotaciones: Número de puntos de inicio del barrido que se prueban.
+
+    Returns:
+        Lista de rutas (listas de nodos desde 1, con el depósito en los extremos).
+    """
+    coordenadas = np.asarray(coordenadas, dtype=np.float64)
+    relativas = coordenadas[1:] - coordenadas[0]
+    orden = np.argsort(np.arctan2(relativas[:, 1], relativas[:, 0]), kind='stable') + 1
+    num_clientes = len(orden)
+    if num_clientes == 0:
+        return []
+    desplazamientos = np.unique(np.linspace(0, num_clientes, rotaciones, endpoint=False).astype(np.int64))
+
+    demandas_orden = np.asarray(demandas, dtype=np.int64)[orden]
+    secuencias = []
+    for desplazamiento in desplazamientos.tolist():
+        # Cortes de la rotación con la demanda acumulada: cada ruta termina justo antes del primer
+        # cliente que la pasaría de capacidad (un cliente que no cabe solo va en su propia ruta)
+        acumulada = np.cumsum(np.roll(demandas_orden, -desplazamiento))
+        cortes = []
+        inicio = 0
+        while inicio < num_clientes:
+            base = acumulada[inicio - 1] if inicio else 0
+            fin = max(int(np.searchsorted(acumulada, base + capacidad, side='right')), inicio + 1)
+            cortes.append(fin)
+            inicio = fin
+        # Secuencia con el depósito (0) en cada corte: [0, a, b, 0, c, ..., 0]
+        secuencias.append(np.concatenate(([0], np.insert(np.roll(orden, -desplazamiento), cortes[:-1], 0), [0])))
+
+    # Coste de todas las rotaciones de una vez
+    longitudes = np.array([len(secuencia) for secuencia in secuencias])
+    todas = np.concatenate(secuencias)
+    tramos = pair_distances(distancias, todas[:-1], todas[1:])
+    inicios = np.concatenate(([0], np.cumsum(longitudes)[:-1]))
+    # El tramo entre dos secuencias es 0 -> 0 y no suma nada
+    costes = np.add.reduceat(tramos, inicios[:len(secuencias)])
+    mejor = secuencias[int(np.argmin(costes))].tolist()
+
+    rutas = []
+    ruta = [1]
+    for nodo in mejor[1:]:
+        if nodo == 0:
+            if len(ruta) > 1:
+                ruta.append(1)
+                rutas.append(ruta)
+            ruta = [1]
+        else:
+            ruta.append(nodo + 1)
+    return rutas
+
+
+def listas_vecinos_construccion(distancias, k=K_VECINOS_CONSTRUCCION):
+    """
+    Vecinos de cada nodo ordenados por distancia, sin el depósito (índices desde 0).
+
+    Se calculan una vez y se reutilizan en todas las construcciones de la misma instancia.
+    """
+    k = max(0, min(k, len(distancias) - 2))
+    vecinos = nearest_neighbors(distancias, k + 1)
+    orden = np.argsort(vecinos == 0, axis=1, kind='stable')
+    return np.take_along_axis(vecinos, orden, axis=1)[:, :k].tolist()
+
+
+def construir_vecino_mas_cercano(distancias, demandas, capacidad, vecinos, aleatorio=random):
+    """
+    Vecino más cercano con cliente inicial aleatorio en cada ruta.
+
+    El siguiente cliente es el no asignado más cercano al actual que cabe en el
+    vehículo. Se busca en las listas de vecinos preordenadas, avanzando un
+    puntero por nodo sobre los ya asignados, de modo que cada paso cuesta un
+    tiempo casi constante amortizado. Los pendientes se guardan en un conjunto
+    indexado con borrado por intercambio con el último (O(1)), y sólo si la lista
+    de vecinos no ofrece ningún cliente factible se recorre el resto.
+
+    Args:
+        distancias: Matriz de distancias.
+        demandas: Demanda de cada nodo (índices desde 0).
+        capacidad: Capacidad del vehículo.
+        vecinos: Resultado de listas_vecinos_construccion.
+        aleatorio: Generador con randrange (random.Random o el módulo random).
+
+    Returns:
+        Lista de rutas (listas de nodos desde 1, con el depósito en los extremos).
+    """
+    num_nodos = len(distancias)
+    demandas = [int(demanda) for demanda in demandas]
+    asignado = bytearray(num_nodos)
+    asignado[0] = 1
+    pendientes = list(range(1, num_nodos))
+    posicion = [0] + list(range(num_nodos - 1))
+    puntero = [0] * num_nodos
+    # Clientes por demanda creciente, para saber en O(1) amortizado si todavía cabe alguno
+    por_demanda = sorted(range(1, num_nodos), key=demandas.__getitem__)
+    puntero_demanda = 0
+
+    def asignar(cliente):
+        asignado[cliente] = 1
+        ultimo = pendientes.pop()
+        if ultimo != cliente:
+            pendientes[posicion[cliente]] = ultimo
+            posicion[ultimo] = posicion[cliente]
+
+    rutas = []
+    while pendientes:
+        actual = pendientes[aleatorio.randrange(len(pendientes))]
+        asignar(actual)
+        ruta = [1, actual + 1]
+        capacidad_restante = capacidad - demandas[actual]
+
+        while pendientes:
+            while asignado[por_demanda[puntero_demanda]]:
+                puntero_demanda += 1
+            if demandas[por_demanda[puntero_demanda]] > capacidad_restante:
+                break
+
+            lista = vecinos[actual]
+            p = puntero[actual]
+            while p < len(lista) and asignado[lista[p]]:
+                p += 1
+            puntero[actual] = p
+            siguiente = -1
+            for indice in range(p, len(lista)):
+                cliente = lista[indice]
+                if not asignado[cliente] and demandas[cliente] <= capacidad_restante:
+                    siguiente = cliente
+                    break
+            if siguiente == -1:
+                fila = distancias[actual]
+                distancia_minima = float('inf')
+                for cliente in pendientes:
+                    if demandas[cliente] <= capacidad_restante and fila[cliente] < distancia_minima:
+                        distancia_minima = fila[cliente]
+                        siguiente = cliente
+                if siguiente == -1:
+                    break
+
+            asignar(siguiente)
+            ruta.append(siguiente + 1)
+            capacidad_restante -= demandas[siguiente]
+            actual = siguiente
+
+        ruta.append(1)
+        rutas.append(ruta)
+    return rutas
@@ -1,17 +1,118 @@
 import random
 import math
+import time
+from contextlib import nullcontext
+
+import numpy as np
+
+from construccion import (construir_ahorros, construir_barrido, construir_vecino_mas_cercano,
+                          listas_vecinos_construccion)
+from distance_matrix import nearest_neighbors
+from estadisticas import Estadisticas, FASE_CONSTRUCCION, FASE_ENTRE_RUTAS, FASE_FUSION, FASE_INTRA_RUTA
+from ruta import MASCARA_HUELLA, Ruta
+
+# Tolerancia para considerar que un movimiento mejora la solución
+EPSILON = 1e-9
+
+# Métodos de construcción de la solución inicial
+CONSTRUCCION_VECINO_ALEATORIO = "vecino_aleatorio"
+CONSTRUCCION_AHORROS = "ahorros"
+CONSTRUCCION_BARRIDO = "barrido"
+
+# Motivos por los que termina resolver (quedan en CVRP.motivo_parada)
+MOTIVO_CONVERGENCIA = "convergencia"
+MOTIVO_TIEMPO = "tiempo"
+MOTIVO_SIN_MEJORA = "sin_mejora"
+MOTIVO_OBJETIVO = "objetivo"
+MOTIVO_ITERACIONES = "iteraciones"
+MOTIVO_REPETIDA = "repetida"  # La solución inicial ya se había visto (ver resolver)
+MOTIVO_SIN_MOVIMIENTOS = "sin_movimientos"  # Ningún movimiento factible (ver tabu.busqueda_tabu)
+
+# Cada cuántas llamadas a debe_parar se calcula el coste para compararlo con el objetivo
+COMPROBACIONES_OBJETIVO = 64
+
+# Contexto vacío para las fases cuando no se recogen estadísticas
+SIN_FASE = nullcontext()
 
 class CVRP:
-    def __init__(self, distancias, demandas, capacidad_vehiculo):
+    def __init__(self, distancias, demandas, capacidad_vehiculo, k_vecinos=None, vecinos=None,
+                 construccion=CONSTRUCCION_VECINO_ALEATORIO, coordenadas=None, semilla=None, estadisticas=False,
+                 verbosidad=0, traza=None):
         self.distancias = distancias
+        self.coordenadas = coordenadas
         self.demandas = demandas
         self.capacidad_vehiculo = capacidad_vehiculo
+        self.construccion = construccion
+        # Generador propio si hay semilla (ejecuciones reproducibles); si no, el módulo random global
+        self.aleatorio = random if semilla is None else random.Random(semilla)
         self.num_clientes = len(distancias)  # Incluyendo el depósito
         self.rutas = []
-        self.cargas = []
+        self.vecinos_construccion = None
+        self.motivo_parada = None
+        self.limite_tiempo = None
+        self.objetivo = None
+        self.detenido = False
+        self.comprobaciones = 0
+        # Vecindario granular: con k_vecinos (o listas ya calculadas) los movimientos entre rutas
+        # sólo prueban parejas de clientes cercanos
+        self.vecinos = None
+        if vecinos is not None or k_vecinos is not None:
+            self.vecinos = self.calcular_vecinos(k_vecinos, vecinos)
+        # Con estadisticas=False no se toman tiempos ni se acumulan contadores. verbosidad 1 muestra
+        # las rutas finales (y las estadísticas, si las hay) al terminar resolver; 2, también cada pasada.
+        self.estadisticas = Estadisticas() if estadisticas else None
+        self.verbosidad = verbosidad
+        # Traza opcional de las mejoras de la mejor solución (ver traza.TrazaConvergencia)
+        self.traza = traza
+        self.iteracion = 0
 
-        print("Demandas inicializadas: ")
-        print(self.demandas)
+    @property
+    def cargas(self):
+        # Las cargas se leen de cada ruta, así nunca se desincronizan de self.rutas
+        return [ruta.carga for ruta in self.rutas]
+
+    def calcular_vecinos(self, k=None, vecinos=None):
+        # Listas de los k clientes más cercanos a cada nodo, numerados desde 1 y sin el depósito.
+        # vecinos puede traer listas ya calculadas con nearest_neighbors (índices desde 0).
+        if vecinos is None:
+            vecinos = nearest_neighbors(self.distancias, k + 1)
+        vecinos = np.asarray(vecinos)
+        if k is None:
+            # Las listas ya calculadas pueden traer el depósito: sólo caben los clientes de cada fila
+            k = int(np.count_nonzero(vecinos[1:] != 0, axis=1).min()) if len(vecinos) > 1 else 0
+        k = min(k, self.num_clientes - 2)
+        # Se quita el depósito conservando el orden por distancia
+        orden = np.argsort(vecinos == 0, axis=1, kind='stable')
+        vecinos = np.take_along_axis(vecinos, orden, axis=1)[:, :k]
+        return [[]] + (vecinos[1:] + 1).tolist()
+
+    def nueva_ruta(self, nodos):
+        return Ruta(nodos, self.distancias, self.demandas)
+
+    def fase(self, nombre):
+        if self.estadisticas is None:
+            return SIN_FASE
+        return self.estadisticas.fase(nombre)
+
+    def aplicar_operador(self, operador, *args):
+        # Ejecuta un operador y, con estadísticas, anota su tiempo y la mejora del coste.
+        # Con traza, anota la solución si es la mejor encontrada hasta ahora.
+        if self.estadisticas is None and self.traza is None:
+            return operador(*args)
+        coste = self.coste_total()
+        inicio = time.perf_counter()
+        resultado = operador(*args)
+        coste_final = self.coste_total()
+        if self.estadisticas is not None:
+            self.estadisticas.registrar_llamada(operador.__name__, time.perf_counter() - inicio, coste - coste_final)
+        if self.traza is not None:
+            self.traza.registrar(self.iteracion, coste_final, len(self.rutas), operador.__name__)
+        return resultado
+
+    def anotar_incumbente(self, coste, operador):
+        # Para los métodos que encuentran soluciones fuera de aplicar_operador
+        if self.traza is not None:
+            self.traza.registrar(self.iteracion, coste, len(self.rutas), operador)
 
     def encontrar_cliente_mas_cercano(self, cliente_actual, clientes_disponibles):
         distancia_minima = float('inf')
@@ -24,132 +125,475 @@ class CVRP:
         return cliente_mas_cercano
 
     def construir_rutas(self):
-        clientes_no_asignados = list(range(2, self.num_clientes + 1))
-        self.rutas = []
-        self.cargas = []
-
-        while clientes_no_asignados:
-            print(f"\nClientes no asignados: {clientes_no_asignados}")
-            ruta_actual = [1]
-            capacidad_restante = self.capacidad_vehiculo
-
-            cliente_inicial = random.choice(clientes_no_asignados)
-            print(f"Cliente inicial seleccionado: {cliente_inicial} con demanda {self.demandas[cliente_inicial - 1]}")
-            if self.demandas[cliente_inicial - 1] > capacidad_restante:
-                print(f"Demanda del cliente inicial {cliente_inicial} excede la capacidad restante")
-                continue
-            ruta_actual.append(cliente_inicial)
-            capacidad_restante -= self.demandas[cliente_inicial - 1]
-            clientes_no_asignados.remove(cliente_inicial)
-            print(f"Ruta actual: {ruta_actual}, Capacidad restante: {capacidad_restante}")
-
-            while capacidad_restante > 0 and clientes_no_asignados:
-                cliente_mas_cercano = self.encontrar_cliente_mas_cercano(ruta_actual[-1], clientes_no_asignados)
-                if cliente_mas_cercano is None or self.demandas[cliente_mas_cercano - 1] > capacidad_restante:
-                    print(f"Cliente {cliente_mas_cercano} no puede ser añadido (demanda excede la capacidad restante)")
-                    break
-                print(f"Cliente actual: {ruta_actual[-1]}, Cliente más cercano: {cliente_mas_cercano}, Distancia mínima: {self.distancias[ruta_actual[-1] - 1][cliente_mas_cercano - 1]}")
-                print(f"Cliente más cercano encontrado: {cliente_mas_cercano} con demanda {self.demandas[cliente_mas_cercano - 1]}")
-                ruta_actual.append(cliente_mas_cercano)
-                capacidad_restante -= self.demandas[cliente_mas_cercano - 1]
-                clientes_no_asignados.remove(cliente_mas_cercano)
-                print(f"Ruta actual: {ruta_actual}, Capacidad restante: {capacidad_restante}")
-
-            ruta_actual.append(1)
-            self.rutas.append(ruta_actual)
-            self.cargas.append(self.capacidad_vehiculo - capacidad_restante)
-            print(f"Ruta finalizada: {ruta_actual}, Carga de la ruta: {self.capacidad_vehiculo - capacidad_restante}")
-
-        # Verificar si todos los clientes han sido asignados
-        clientes_asignados = set()
-        for ruta in self.rutas:
-            clientes_asignados.update(ruta[1:-1])
-        no_asignados = set(range(2, self.num_clientes + 1)) - clientes_asignados
-        if no_asignados:
-            print(f"Clientes no asignados al final de la construcción: {no_asignados}")
-            for cliente in no_asignados:
-                self.rutas.append([1, cliente, 1])
-                self.cargas.append(self.demandas[cliente - 1])
-
-    def mejorar_rutas_localmente(self):
-        for ruta in self.rutas:
-            for i in range(1, len(ruta) - 1):
-                for j in range(i + 1, len(ruta) - 1):
-                    nueva_ruta = ruta[:i] + [ruta[j]] + ruta[i + 1:j] + [ruta[i]] + ruta[j + 1:]
-                    distancia_original = self.calcular_distancia(ruta)
-                    distancia_nueva = self.calcular_distancia(nueva_ruta)
-                    if distancia_nueva <= distancia_original:
-                        ruta[:] = nueva_ruta
-                        break
+        if self.construccion == CONSTRUCCION_AHORROS:
+            self.rutas = [self.nueva_ruta(nodos) for nodos in
+                          construir_ahorros(self.distancias, self.demandas, self.capacidad_vehiculo, self.vecinos)]
+        elif self.construccion == CONSTRUCCION_BARRIDO:
+            if self.coordenadas is None:
+                raise ValueError("La construcción por barrido necesita las coordenadas de los nodos")
+            self.rutas = [self.nueva_ruta(nodos) for nodos in
+                          construir_barrido(self.coordenadas, self.distancias, self.demandas, self.capacidad_vehiculo)]
+        elif self.construccion == CONSTRUCCION_VECINO_ALEATORIO:
+            self.construir_rutas_vecino_aleatorio()
+        else:
+            raise ValueError(f"Método de construcción desconocido: {self.construccion}")
+
+    def construir_rutas_vecino_aleatorio(self):
+        # Las listas de vecinos ordenadas se calculan una vez y sirven para todas las construcciones
+        if self.vecinos_construccion is None:
+            self.vecinos_construccion = listas_vecinos_construccion(self.distancias)
+        self.rutas = [self.nueva_ruta(nodos) for nodos in
+                      construir_vecino_mas_cercano(self.distancias, self.demandas, self.capacidad_vehiculo,
+                                                   self.vecinos_construccion, self.aleatorio)]
+
+    def mejorar_rutas_localmente(self, rutas=None):
+        # Intercambio y 2-opt dentro de cada ruta (o sólo de las rutas indicadas). Cada candidato se
+        # evalúa en O(1) con el cambio en las aristas afectadas y los movimientos aceptados se
+        # aplican sobre la propia ruta.
+        evaluados = aceptados = 0
+        for ruta in self.rutas if rutas is None else rutas:
+            if self.debe_parar():
+                break
+            nodos = ruta.nodos
+            mejora = True
+            while mejora:
+                mejora = False
+                evaluados += (len(nodos) - 3) * (len(nodos) - 2) // 2
+                for i in range(1, len(nodos) - 2):
+                    for j in range(i + 1, len(nodos) - 1):
+                        if self.delta_2opt(nodos, i, j) < -EPSILON:
+                            ruta.invertir(i, j)
+                            mejora = True
+                            aceptados += 1
+                        elif self.delta_intercambio(nodos, i, j) < -EPSILON:
+                            ruta.intercambiar(i, j)
+                            mejora = True
+                            aceptados += 1
+        if self.estadisticas is not None:
+            self.estadisticas.contar("mejorar_rutas_localmente", evaluados, aceptados)
 
-    def intercambiar_nodos_entre_rutas(self):
+    def delta_intercambio(self, ruta, i, j):
+        # Cambio de distancia al intercambiar las posiciones i < j de la ruta
+        d = self.distancias
+        anterior_i, a, siguiente_i = ruta[i - 1] - 1, ruta[i] - 1, ruta[i + 1] - 1
+        anterior_j, b, siguiente_j = ruta[j - 1] - 1, ruta[j] - 1, ruta[j + 1] - 1
+        if j == i + 1:
+            return (d[anterior_i][b] + d[b][a] + d[a][siguiente_j]
+                    - d[anterior_i][a] - d[a][b] - d[b][siguiente_j])
+        return (d[anterior_i][b] + d[b][siguiente_i] + d[anterior_j][a] + d[a][siguiente_j]
+                - d[anterior_i][a] - d[a][siguiente_i] - d[anterior_j][b] - d[b][siguiente_j])
+
+    def delta_2opt(self, ruta, i, j):
+        # Cambio de distancia al invertir el tramo ruta[i..j]
+        d = self.distancias
+        anterior, primero, ultimo, siguiente = ruta[i - 1] - 1, ruta[i] - 1, ruta[j] - 1, ruta[j + 1] - 1
+        return d[anterior][ultimo] + d[primero][siguiente] - d[anterior][primero] - d[ultimo][siguiente]
+
+    def delta_reemplazo(self, ruta, i, nodo):
+        # Cambio de distancia al poner nodo en lugar de ruta[i]
+        d = self.distancias
+        anterior, actual, siguiente, nuevo = ruta[i - 1] - 1, ruta[i] - 1, ruta[i + 1] - 1, nodo - 1
+        return d[anterior][nuevo] + d[nuevo][siguiente] - d[anterior][actual] - d[actual][siguiente]
+
+    def intercambiar_nodos_entre_rutas(self, clientes=None, indice=None):
+        # clientes sólo restringe la búsqueda con vecindario granular
+        if self.vecinos is not None:
+            return self.intercambiar_nodos_granular(clientes, indice)
+        mejora = False
+        evaluados = aceptados = 0
         for i in range(len(self.rutas)):
+            if self.debe_parar():
+                break
             for j in range(i + 1, len(self.rutas)):
-                for cliente_ruta1 in self.rutas[i][1:-1]:
-                    for cliente_ruta2 in self.rutas[j][1:-1]:
-                        nueva_ruta1 = self.rutas[i][:]
-                        nueva_ruta2 = self.rutas[j][:]
-                        nueva_ruta1[nueva_ruta1.index(cliente_ruta1)] = cliente_ruta2
-                        nueva_ruta2[nueva_ruta2.index(cliente_ruta2)] = cliente_ruta1
-                        carga_nueva_ruta1 = sum(self.demandas[cliente - 1] for cliente in nueva_ruta1[1:-1])
-                        carga_nueva_ruta2 = sum(self.demandas[cliente - 1] for cliente in nueva_ruta2[1:-1])
-                        if carga_nueva_ruta1 <= self.capacidad_vehiculo and carga_nueva_ruta2 <= self.capacidad_vehiculo:
-                            if self.calcular_distancia(nueva_ruta1) + self.calcular_distancia(nueva_ruta2) < self.calcular_distancia(self.rutas[i]) + self.calcular_distancia(self.rutas[j]):
-                                self.rutas[i] = nueva_ruta1
-                                self.rutas[j] = nueva_ruta2
-                                self.cargas[i] = carga_nueva_ruta1
-                                self.cargas[j] = carga_nueva_ruta2
-                                break
+                ruta1 = self.rutas[i]
+                ruta2 = self.rutas[j]
+                evaluados += (len(ruta1) - 2) * (len(ruta2) - 2)
+                for p in range(1, len(ruta1) - 1):
+                    for q in range(1, len(ruta2) - 1):
+                        cliente_ruta1 = ruta1.nodos[p]
+                        cliente_ruta2 = ruta2.nodos[q]
+                        diferencia = self.demandas[cliente_ruta2 - 1] - self.demandas[cliente_ruta1 - 1]
+                        if ruta1.carga + diferencia > self.capacidad_vehiculo or ruta2.carga - diferencia > self.capacidad_vehiculo:
+                            continue
+                        if self.delta_reemplazo(ruta1.nodos, p, cliente_ruta2) + self.delta_reemplazo(ruta2.nodos, q, cliente_ruta1) < -EPSILON:
+                            ruta1.reemplazar(p, cliente_ruta2)
+                            ruta2.reemplazar(q, cliente_ruta1)
+                            if indice is not None:
+                                ruta_de, posicion = indice
+                                ruta_de[cliente_ruta1], ruta_de[cliente_ruta2] = ruta2, ruta1
+                                posicion[cliente_ruta1], posicion[cliente_ruta2] = q, p
+                            mejora = True
+                            aceptados += 1
+                            break
+        if self.estadisticas is not None:
+            self.estadisticas.contar("intercambiar_nodos_entre_rutas", evaluados, aceptados)
+        return mejora
+
+    def intercambiar_nodos_granular(self, clientes=None, indice=None):
+        # Intercambio uno por uno sólo entre cada cliente y sus vecinos de otras rutas
+        ruta_de, posicion = self.indice_rutas() if indice is None else indice
+        mejora = False
+        evaluados = aceptados = 0
+        for u in self.clientes_revisados(clientes):
+            if self.debe_parar():
+                break
+            candidatos = self.candidatos(u)
+            evaluados += len(candidatos)
+            for v in candidatos:
+                ruta_u = ruta_de[u]
+                ruta_v = ruta_de[v]
+                if ruta_v is None or ruta_v is ruta_u:
+                    continue
+                diferencia = self.demandas[v - 1] - self.demandas[u - 1]
+                if ruta_u.carga + diferencia > self.capacidad_vehiculo or ruta_v.carga - diferencia > self.capacidad_vehiculo:
+                    continue
+                pu = posicion[u]
+                pv = posicion[v]
+                if self.delta_reemplazo(ruta_u.nodos, pu, v) + self.delta_reemplazo(ruta_v.nodos, pv, u) < -EPSILON:
+                    ruta_u.reemplazar(pu, v)
+                    ruta_v.reemplazar(pv, u)
+                    ruta_de[u], ruta_de[v] = ruta_v, ruta_u
+                    posicion[u], posicion[v] = pv, pu
+                    mejora = True
+                    aceptados += 1
+        if self.estadisticas is not None:
+            self.estadisticas.contar("intercambiar_nodos_entre_rutas", evaluados, aceptados)
+        return mejora
+
+    def mejorar_entre_rutas(self, clientes=None, indice=None):
+        # Con clientes, los movimientos granulares sólo parten de esos clientes (ver reoptimizacion).
+        # indice es el de indice_rutas, ya al día; los operadores lo mantienen al aplicar cada movimiento
+        # y sin él cada uno lo calcula de nuevo.
+        mejora = False
+        for operador in (self.relocalizar_entre_rutas, self.intercambiar_nodos_entre_rutas,
+                         self.dos_opt_estrella, self.swap_estrella):
+            if self.debe_parar():
+                break
+            mejora = self.aplicar_operador(operador, clientes, indice) or mejora
+        return mejora
+
+    def indexar_rutas(self):
+        # Ruta en la que está cada cliente
+        return {cliente: ruta for ruta in self.rutas for cliente in ruta.nodos[1:-1]}
+
+    def indice_rutas(self):
+        # Listas indexadas por nodo con la ruta de cada cliente (None para el depósito) y su posición.
+        # Los operadores las consultan en O(1) por candidato y reindexan con indexar_ruta sólo las
+        # rutas que cambia cada movimiento aceptado.
+        ruta_de = [None] * (self.num_clientes + 1)
+        posicion = [0] * (self.num_clientes + 1)
+        for ruta in self.rutas:
+            self.indexar_ruta(ruta, ruta_de, posicion)
+        return ruta_de, posicion
+
+    def indexar_ruta(self, ruta, ruta_de, posicion):
+        nodos = ruta.nodos
+        for p in range(1, len(nodos) - 1):
+            ruta_de[nodos[p]] = ruta
+            posicion[nodos[p]] = p
+
+    def clientes_revisados(self, clientes):
+        # Clientes desde los que se prueban los movimientos entre rutas: todos o sólo los indicados
+        return range(2, self.num_clientes + 1) if clientes is None else clientes
+
+    def candidatos(self, cliente):
+        # Clientes con los que se prueban los movimientos entre rutas de cliente
+        if self.vecinos is not None:
+            return self.vecinos[cliente - 1]
+        return range(2, self.num_clientes + 1)
+
+    def eliminar_rutas_vacias(self):
+        self.rutas = [ruta for ruta in self.rutas if len(ruta) > 2]
+
+    def delta_eliminacion(self, nodos, p):
+        # Cambio de distancia al quitar nodos[p] de su ruta
+        d = self.distancias
+        anterior, actual, siguiente = nodos[p - 1] - 1, nodos[p] - 1, nodos[p + 1] - 1
+        return d[anterior][siguiente] - d[anterior][actual] - d[actual][siguiente]
+
+    def delta_insercion(self, nodos, q, cliente):
+        # Cambio de distancia al insertar cliente entre nodos[q - 1] y nodos[q]
+        d = self.distancias
+        anterior, siguiente, nuevo = nodos[q - 1] - 1, nodos[q] - 1, cliente - 1
+        return d[anterior][nuevo] + d[nuevo][siguiente] - d[anterior][siguiente]
+
+    def relocalizar_entre_rutas(self, clientes=None, indice=None):
+        # Mueve cada cliente a la mejor posición junto a uno de sus candidatos en otra ruta
+        ruta_de, posicion = self.indice_rutas() if indice is None else indice
+        mejora = False
+        evaluados = aceptados = 0
+        for u in self.clientes_revisados(clientes):
+            if self.debe_parar():
+                break
+            ruta_u = ruta_de[u]
+            demanda_u = self.demandas[u - 1]
+            p = posicion[u]
+            eliminacion = self.delta_eliminacion(ruta_u.nodos, p)
+            mejor_delta, mejor_ruta, mejor_q = -EPSILON, None, 0
+            candidatos = self.candidatos(u)
+            evaluados += 2 * len(candidatos)
+            for v in candidatos:
+                ruta_v = ruta_de[v]
+                if ruta_v is None or ruta_v is ruta_u or ruta_v.carga + demanda_u > self.capacidad_vehiculo:
+                    continue
+                pv = posicion[v]
+                for q in (pv, pv + 1):
+                    delta = eliminacion + self.delta_insercion(ruta_v.nodos, q, u)
+                    if delta < mejor_delta:
+                        mejor_delta, mejor_ruta, mejor_q = delta, ruta_v, q
+            if mejor_ruta is not None:
+                ruta_u.eliminar(p)
+                mejor_ruta.insertar(mejor_q, u)
+                self.indexar_ruta(ruta_u, ruta_de, posicion)
+                self.indexar_ruta(mejor_ruta, ruta_de, posicion)
+                mejora = True
+                aceptados += 1
+        if mejora:
+            self.eliminar_rutas_vacias()
+        if self.estadisticas is not None:
+            self.estadisticas.contar("relocalizar_entre_rutas", evaluados, aceptados)
+        return mejora
+
+    def dos_opt_estrella(self, clientes=None, indice=None):
+        # 2-opt*: intercambia las colas de dos rutas creando la arista (u, v)
+        d = self.distancias
+        ruta_de, posicion = self.indice_rutas() if indice is None else indice
+        mejora = False
+        evaluados = aceptados = 0
+        for u in self.clientes_revisados(clientes):
+            if self.debe_parar():
+                break
+            candidatos = self.candidatos(u)
+            evaluados += len(candidatos)
+            for v in candidatos:
+                ruta_u = ruta_de[u]
+                ruta_v = ruta_de[v]
+                if ruta_v is None or ruta_v is ruta_u:
+                    continue
+                pu = posicion[u]
+                pv = posicion[v]
+                # ruta_u[:pu + 1] + ruta_v[pv:] y ruta_v[:pv] + ruta_u[pu + 1:]
+                carga_cola_u = ruta_u.carga - ruta_u.carga_prefijo[pu]
+                carga_cola_v = ruta_v.carga - ruta_v.carga_prefijo[pv - 1]
+                if (ruta_u.carga_prefijo[pu] + carga_cola_v > self.capacidad_vehiculo
+                        or ruta_v.carga_prefijo[pv - 1] + carga_cola_u > self.capacidad_vehiculo):
+                    continue
+                siguiente_u, anterior_v = ruta_u.nodos[pu + 1] - 1, ruta_v.nodos[pv - 1] - 1
+                delta = (d[u - 1][v - 1] + d[anterior_v][siguiente_u]
+                         - d[u - 1][siguiente_u] - d[anterior_v][v - 1])
+                if delta < -EPSILON:
+                    cola_u = ruta_u.nodos[pu + 1:]
+                    cola_v = ruta_v.nodos[pv:]
+                    ruta_u.reemplazar_cola(pu + 1, cola_v)
+                    ruta_v.reemplazar_cola(pv, cola_u)
+                    self.indexar_ruta(ruta_u, ruta_de, posicion)
+                    self.indexar_ruta(ruta_v, ruta_de, posicion)
+                    mejora = True
+                    aceptados += 1
+        if mejora:
+            self.eliminar_rutas_vacias()
+        if self.estadisticas is not None:
+            self.estadisticas.contar("dos_opt_estrella", evaluados, aceptados)
+        return mejora
+
+    def mejores_inserciones(self, cliente, ruta):
+        # Las tres posiciones de menor coste para insertar cliente en ruta, como (coste, q)
+        nodos = ruta.nodos
+        mejores = [(float('inf'), 0)] * 3
+        for q in range(1, len(nodos)):
+            coste = self.delta_insercion(nodos, q, cliente)
+            if coste < mejores[2][0]:
+                mejores[2] = (coste, q)
+                mejores.sort()
+        return mejores
+
+    def insercion_sin(self, cliente, ruta, pv, mejores):
+        # Mejor inserción de cliente en ruta una vez quitado nodos[pv]. Devuelve (coste, q) con q
+        # referido a la ruta original; q == pv significa ocupar el sitio del nodo quitado.
+        nodos = ruta.nodos
+        d = self.distancias
+        anterior, siguiente, nuevo = nodos[pv - 1] - 1, nodos[pv + 1] - 1, cliente - 1
+        mejor = (d[anterior][nuevo] + d[nuevo][siguiente] - d[anterior][siguiente], pv)
+        for coste, q in mejores:
+            if q != pv and q != pv + 1:
+                if coste < mejor[0]:
+                    mejor = (coste, q)
+                break
+        return mejor
+
+    def swap_estrella(self, clientes=None, indice=None):
+        # SWAP*: intercambia u y v entre sus rutas, reinsertando cada uno en su mejor posición de la otra
+        ruta_de, posicion = self.indice_rutas() if indice is None else indice
+        inserciones = {}  # id(ruta) -> {cliente: tres mejores inserciones en esa ruta}
+        mejora = False
+        evaluados = aceptados = 0
+        for u in self.clientes_revisados(clientes):
+            if self.debe_parar():
+                break
+            candidatos = self.candidatos(u)
+            evaluados += len(candidatos)
+            for v in candidatos:
+                ruta_u = ruta_de[u]
+                ruta_v = ruta_de[v]
+                if ruta_v is None or ruta_v is ruta_u:
+                    continue
+                diferencia = self.demandas[v - 1] - self.demandas[u - 1]
+                if (ruta_u.carga + diferencia > self.capacidad_vehiculo
+                        or ruta_v.carga - diferencia > self.capacidad_vehiculo):
+                    continue
+                pu = posicion[u]
+                pv = posicion[v]
+                en_v = inserciones.setdefault(id(ruta_v), {})
+                en_u = inserciones.setdefault(id(ruta_u), {})
+                if u not in en_v:
+                    en_v[u] = self.mejores_inserciones(u, ruta_v)
+                if v not in en_u:
+                    en_u[v] = self.mejores_inserciones(v, ruta_u)
+                coste_u, q_u = self.insercion_sin(u, ruta_v, pv, en_v[u])
+                coste_v, q_v = self.insercion_sin(v, ruta_u, pu, en_u[v])
+                delta = (self.delta_eliminacion(ruta_u.nodos, pu) + self.delta_eliminacion(ruta_v.nodos, pv)
+                         + coste_u + coste_v)
+                if delta < -EPSILON:
+                    ruta_u.eliminar(pu)
+                    ruta_v.eliminar(pv)
+                    ruta_v.insertar(q_u - 1 if q_u > pv else q_u, u)
+                    ruta_u.insertar(q_v - 1 if q_v > pu else q_v, v)
+                    self.indexar_ruta(ruta_u, ruta_de, posicion)
+                    self.indexar_ruta(ruta_v, ruta_de, posicion)
+                    inserciones.pop(id(ruta_u), None)
+                    inserciones.pop(id(ruta_v), None)
+                    mejora = True
+                    aceptados += 1
+        if self.estadisticas is not None:
+            self.estadisticas.contar("swap_estrella", evaluados, aceptados)
+        return mejora
 
     def calcular_distancia(self, ruta):
+        if isinstance(ruta, Ruta):
+            return ruta.distancia
         distancia_total = 0
         for i in range(len(ruta) - 1):
             distancia_total += self.distancias[ruta[i] - 1][ruta[i + 1] - 1]
         return distancia_total
 
-    def rutas_iguales(self, rutas1, rutas2):
-        if len(rutas1) != len(rutas2):
-            return False
-        for ruta1, ruta2 in zip(rutas1, rutas2):
-            if ruta1 != ruta2:
-                return False
-        return True
-
-    def resolver(self):
-        self.construir_rutas()
-        print("\nRutas iniciales: ")
-        self.imprimir_rutas()
-        while True:
-            rutas_anteriores = self.rutas.copy()  # Copia superficial
-            cargas_anteriores = self.cargas.copy()  # Copia superficial
-            self.mejorar_rutas_localmente()
-            self.intercambiar_nodos_entre_rutas()
-            if self.rutas_iguales(self.rutas, rutas_anteriores) and self.cargas == cargas_anteriores:
+    def huella(self):
+        # Huella de la solución: las huellas de las rutas se mantienen con cada movimiento (ver Ruta),
+        # así que basta sumarlas. No depende del orden de las rutas ni del sentido de recorrido.
+        return sum(ruta.huella for ruta in self.rutas) & MASCARA_HUELLA
+
+    def coste_total(self):
+        return sum(ruta.distancia for ruta in self.rutas)
+
+    def iniciar_parada(self, tiempo_limite=None, objetivo=None):
+        # Criterios de parada que los operadores comprueban entre evaluaciones con debe_parar
+        self.limite_tiempo = None if tiempo_limite is None else time.perf_counter() + tiempo_limite
+        self.objetivo = objetivo
+        self.detenido = False
+        self.comprobaciones = 0
+        self.motivo_parada = None
+
+    def finalizar_parada(self):
+        self.limite_tiempo = None
+        self.objetivo = None
+        self.detenido = False
+
+    def debe_parar(self):
+        if self.detenido:
+            return True
+        if self.limite_tiempo is not None and time.perf_counter() >= self.limite_tiempo:
+            self.detenido = True
+            self.motivo_parada = MOTIVO_TIEMPO
+        elif self.objetivo is not None:
+            self.comprobaciones += 1
+            if self.comprobaciones % COMPROBACIONES_OBJETIVO == 0 and self.coste_total() <= self.objetivo:
+                self.detenido = True
+                self.motivo_parada = MOTIVO_OBJETIVO
+        return self.detenido
+
+    def resolver(self, tiempo_limite=None, max_pasadas_sin_mejora=None, objetivo=None, vistas=None):
+        # tiempo_limite en segundos, max_pasadas_sin_mejora en pasadas completas de búsqueda local y
+        # objetivo como coste total. Siempre se devuelve la mejor solución encontrada, y el motivo
+        # de la parada queda en self.motivo_parada.
+        # vistas es un conjunto opcional de huellas de soluciones iniciales de ejecuciones anteriores:
+        # como la búsqueda local es determinista, si la construcción repite una, el resultado también
+        # se repetiría y se devuelve la solución inicial sin mejorarla (motivo MOTIVO_REPETIDA).
+        self.iniciar_parada(tiempo_limite, objetivo)
+        self.iteracion = 0
+        with self.fase(FASE_CONSTRUCCION):
+            self.construir_rutas()
+        self.anotar_incumbente(self.coste_total(), FASE_CONSTRUCCION)
+        if vistas is not None:
+            huella = self.huella()
+            if huella in vistas:
+                self.motivo_parada = MOTIVO_REPETIDA
+                self.finalizar_parada()
+                return self.rutas
+            vistas.add(huella)
+        if self.verbosidad >= 2:
+            print("\nRutas iniciales: ")
+            self.imprimir_rutas()
+        mejor_coste = self.coste_total()
+        mejores_rutas = [ruta.copia() for ruta in self.rutas]
+        pasadas_sin_mejora = 0
+        if objetivo is not None and mejor_coste <= objetivo:
+            self.motivo_parada = MOTIVO_OBJETIVO
+        while self.motivo_parada is None:
+            self.iteracion += 1
+            huella_anterior = self.huella()
+            with self.fase(FASE_INTRA_RUTA):
+                self.aplicar_operador(self.mejorar_rutas_localmente)
+            with self.fase(FASE_ENTRE_RUTAS):
+                self.mejorar_entre_rutas()
+            coste = self.coste_total()
+            if self.verbosidad >= 2:
+                print(f"Pasada: coste {coste}, {len(self.rutas)} rutas")
+            if coste < mejor_coste - EPSILON:
+                mejor_coste = coste
+                mejores_rutas = [ruta.copia() for ruta in self.rutas]
+                pasadas_sin_mejora = 0
+            else:
+                pasadas_sin_mejora += 1
+            if self.motivo_parada is not None:
                 break
-        self.fusionar_rutas()
-        print("\nRutas finales: ")
-        self.imprimir_rutas()
+            if objetivo is not None and mejor_coste <= objetivo:
+                self.motivo_parada = MOTIVO_OBJETIVO
+            elif max_pasadas_sin_mejora is not None and pasadas_sin_mejora >= max_pasadas_sin_mejora:
+                self.motivo_parada = MOTIVO_SIN_MEJORA
+            elif self.huella() == huella_anterior:
+                self.motivo_parada = MOTIVO_CONVERGENCIA
+        if self.coste_total() > mejor_coste:
+            self.rutas = mejores_rutas
+        if self.motivo_parada != MOTIVO_TIEMPO:
+            with self.fase(FASE_FUSION):
+                self.aplicar_operador(self.fusionar_rutas)
+        self.finalizar_parada()
+        if self.verbosidad >= 1:
+            print(f"\nRutas finales ({self.motivo_parada}): ")
+            self.imprimir_rutas()
+            if self.estadisticas is not None:
+                print(self.estadisticas.informe())
         return self.rutas
 
     def fusionar_rutas(self):
         fusion = True
+        evaluados = aceptados = 0
         while fusion:
             fusion = False
             for i in range(len(self.rutas)):
+                evaluados += len(self.rutas) - i - 1
                 for j in range(i + 1, len(self.rutas)):
-                    nueva_ruta = [1] + self.rutas[i][1:-1] + self.rutas[j][1:-1] + [1]
-                    carga_total = sum(self.demandas[cliente - 1] for cliente in nueva_ruta[1:-1])
-                    if carga_total <= self.capacidad_vehiculo:
+                    if self.rutas[i].carga + self.rutas[j].carga <= self.capacidad_vehiculo:
+                        nueva_ruta = self.nueva_ruta([1] + self.rutas[i][1:-1] + self.rutas[j][1:-1] + [1])
                         self.rutas.append(nueva_ruta)
                         del self.rutas[j]
                         del self.rutas[i]
-                        self.cargas.append(carga_total)
-                        del self.cargas[j]
-                        del self.cargas[i]
                         fusion = True
+                        aceptados += 1
                         break
                 if fusion:
                     break
+        if self.estadisticas is not None:
+            self.estadisticas.contar("fusionar_rutas", evaluados, aceptados)
 
     def imprimir_rutas(self):
         for i, ruta in enumerate(self.rutas):
@@ -158,8 +602,8 @@ class CVRP:
         distancia_total = 0
         carga_total = 0
         for i, ruta in enumerate(self.rutas):
-            distancia_ruta = self.calcular_distancia(ruta)
-            carga_vehiculo = sum(self.demandas[cliente - 1] for cliente in ruta[1:-1])
+            distancia_ruta = ruta.distancia
+            carga_vehiculo = ruta.carga
             print(f"Ruta {i + 1}: Distancia = {distancia_ruta}, Carga del vehículo = {carga_vehiculo}")
             distancia_total += distancia_ruta
             carga_total += carga_vehiculo
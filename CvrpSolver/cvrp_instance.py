@@ -1,4 +1,15 @@
+import gzip
 import math
+import re
+
+import numpy as np
+
+from distance_cache import cached_distance_matrix
+from distance_matrix import build_distance_matrix
+from distance_oracle import DistanceOracle, MAX_CACHED_ROWS
+
+# Línea que abre una sección de datos (o el EOF) en un fichero TSPLIB/CVRPLIB
+SECTION_PATTERN = re.compile(r"^[ \t]*([A-Z_]+_SECTION|EOF)[ \t]*:?[ \t]*$", re.MULTILINE)
 
 class CVRPInstance:
     def __init__(self):
@@ -9,19 +20,54 @@ class CVRPInstance:
         self.type = ""
         self.dimension = 0
         self.edge_weight_type = ""
+        self.edge_weight_format = ""
         self.capacity = 0
-        self.node_coords = {}
-        self.demands = {}
         self.depot = 0
+        self.coords = None
+        self.demand_array = None
+        self.neighbors = None
         self.distance_matrix = []
+        self.node_coords = None
+        self.demands = None
+
+    # node_coords y demands se construyen desde los arrays sólo cuando alguien los usa
+    @property
+    def node_coords(self):
+        if self._node_coords is None:
+            coords = [] if self.coords is None else self.coords.tolist()
+            self._node_coords = dict(zip(range(1, len(coords) + 1), map(tuple, coords)))
+        return self._node_coords
+
+    @node_coords.setter
+    def node_coords(self, node_coords):
+        self._node_coords = node_coords
+
+    @property
+    def demands(self):
+        if self._demands is None:
+            demands = [] if self.demand_array is None else self.demand_array.tolist()
+            self._demands = dict(zip(range(1, len(demands) + 1), demands))
+        return self._demands
+
+    @demands.setter
+    def demands(self, demands):
+        self._demands = demands
 
-    def calculate_distance_matrix(self):
-        num_nodes = self.dimension
-        self.distance_matrix = [[0] * num_nodes for _ in range(num_nodes)]
-        for i in range(1, num_nodes + 1):
-            for j in range(1, num_nodes + 1):
-                if i != j:
-                    self.distance_matrix[i - 1][j - 1] = self.euclidean_distance(self.node_coords[i], self.node_coords[j])
+    def coords_array(self):
+        if self.coords is None and self._node_coords:
+            self.coords = np.array([self.node_coords[i] for i in range(1, self.dimension + 1)], dtype=np.float64)
+        return self.coords
+
+    def calculate_distance_matrix(self, cache_dir=None):
+        coords = self.coords_array()
+        if cache_dir is not None:
+            self.distance_matrix = cached_distance_matrix(coords, self.edge_weight_type, cache_dir)
+        else:
+            self.distance_matrix = build_distance_matrix(coords, self.edge_weight_type)
+
+    def build_distance_oracle(self, max_cached_rows=MAX_CACHED_ROWS):
+        # Para instancias grandes: sólo coordenadas y una caché LRU de filas, en lugar de la matriz densa
+        self.distance_matrix = DistanceOracle(self.coords_array(), self.edge_weight_type, max_cached_rows)
 
     @staticmethod
     def euclidean_distance(coord1, coord2):
@@ -29,63 +75,124 @@ class CVRPInstance:
         x2, y2 = coord2
         return math.sqrt((x1 - x2) ** 2 + (y1 - y2) ** 2)
 
-def read_cvrp_instance(file_path):
+def read_instance_text(file_path):
+    """
+    Lee el fichero completo como texto, descomprimiéndolo si está en gzip.
+    """
+    with open(file_path, 'rb') as file:
+        data = file.read()
+    if data[:2] == b'\x1f\x8b':
+        data = gzip.decompress(data)
+    return data.decode('utf-8', errors='replace').replace('\r', '')
+
+
+def parse_header(instance, header):
+    for line in header.splitlines():
+        key, _, value = line.partition(":")
+        key = key.strip()
+        value = value.strip()
+        if key == "NAME":
+            instance.name = value
+        elif key == "COMMENT":
+            instance.comment = value
+            no_of_trucks = re.search(r"No of trucks:?\s*(\d+)", value)
+            optimal_value = re.search(r"(?:Optimal|Best) value:?\s*(\d+)", value)
+            if no_of_trucks:
+                instance.no_of_trucks = int(no_of_trucks.group(1))
+            if optimal_value:
+                instance.optimal_value = int(optimal_value.group(1))
+        elif key == "TYPE":
+            instance.type = value
+        elif key == "DIMENSION":
+            instance.dimension = int(value)
+        elif key == "EDGE_WEIGHT_TYPE":
+            instance.edge_weight_type = value
+        elif key == "EDGE_WEIGHT_FORMAT":
+            instance.edge_weight_format = value
+        elif key == "CAPACITY":
+            instance.capacity = int(value)
+
+
+def parse_table(body, num_rows):
+    """
+    Convierte de una vez el cuerpo de una sección en un numpy.ndarray de num_rows filas.
+    """
+    return np.array(body.split(), dtype=np.float64).reshape(num_rows, -1)
+
+
+def explicit_distance_matrix(weights, dimension, edge_weight_format):
+    """
+    Reconstruye la matriz de distancias a partir de un EDGE_WEIGHT_SECTION.
+
+    Args:
+        weights: numpy.ndarray plano con los pesos en el orden del fichero.
+        dimension: Número de nodos.
+        edge_weight_format: FULL_MATRIX, LOWER_ROW, UPPER_ROW, LOWER_DIAG_ROW o UPPER_DIAG_ROW.
+
+    Returns:
+        numpy.ndarray (dimension, dimension) simétrica de float64.
+    """
+    if edge_weight_format == "FULL_MATRIX":
+        return np.ascontiguousarray(weights[:dimension * dimension].reshape(dimension, dimension))
+    if edge_weight_format == "LOWER_ROW":
+        rows, cols = np.tril_indices(dimension, -1)
+    elif edge_weight_format == "UPPER_ROW":
+        rows, cols = np.triu_indices(dimension, 1)
+    elif edge_weight_format == "LOWER_DIAG_ROW":
+        rows, cols = np.tril_indices(dimension)
+    elif edge_weight_format == "UPPER_DIAG_ROW":
+        rows, cols = np.triu_indices(dimension)
+    else:
+        raise ValueError(f"EDGE_WEIGHT_FORMAT no soportado: {edge_weight_format}")
+    matrix = np.zeros((dimension, dimension), dtype=np.float64)
+    matrix[rows, cols] = weights[:len(rows)]
+    matrix[cols, rows] = weights[:len(rows)]
+    return matrix
+
+
+def read_cvrp_instance(file_path, lazy_distances=False, max_cached_rows=MAX_CACHED_ROWS, cache_dir=None):
+    """
+    Lee una instancia TSPLIB/CVRPLIB (en texto plano o gzip).
+
+    Cada sección se convierte de una vez en arrays de NumPy. Se admiten
+    coordenadas enteras o reales (EUC_2D, CEIL_2D, GEO...) y distancias
+    explícitas en EDGE_WEIGHT_SECTION.
+
+    Args:
+        file_path: Ruta del fichero de la instancia.
+        lazy_distances: Si es True, usa un DistanceOracle en lugar de la matriz densa.
+        max_cached_rows: Filas en caché del DistanceOracle.
+        cache_dir: Directorio de la caché en disco de matrices de distancias, o None para no usarla.
+
+    Returns:
+        CVRPInstance con los datos leídos y distance_matrix calculada.
+    """
     instance = CVRPInstance()
-    with open(file_path, 'r') as file:
-        for line in file:
-            line = line.strip()
-            if line.startswith("NAME"):
-                instance.name = line.split(":")[1].strip()
-            elif line.startswith("COMMENT"):
-                instance.comment = line.split(":")[1].strip()
-                no_of_trucks_index = instance.comment.find("No of trucks")
-                optimal_value_index = instance.comment.find("Optimal value")
-                if no_of_trucks_index != -1:
-                    no_of_trucks_substr = ''.join(filter(str.isdigit, instance.comment[no_of_trucks_index:]))
-                    if no_of_trucks_substr.isdigit():
-                        instance.no_of_trucks = int(no_of_trucks_substr)
-                if optimal_value_index != -1:
-                    optimal_value_substr = ''.join(filter(str.isdigit, instance.comment[optimal_value_index:]))
-                    if optimal_value_substr.isdigit():
-                        instance.optimal_value = int(optimal_value_substr)
-            elif line.startswith("TYPE"):
-                instance.type = line.split(":")[1].strip()
-            elif line.startswith("DIMENSION"):
-                instance.dimension = int(line.split(":")[1].strip())
-            elif line.startswith("EDGE_WEIGHT_TYPE"):
-                instance.edge_weight_type = line.split(":")[1].strip()
-            elif line.startswith("CAPACITY"):
-                instance.capacity = int(line.split(":")[1].strip())
-            elif line == "NODE_COORD_SECTION":
-                break
-
-        #print("Leyendo NODE_COORD_SECTION")
-        for line in file:
-            line = line.strip()
-            if line == "DEMAND_SECTION":
-                break
-            node_id, x, y = map(int, line.split())
-            instance.node_coords[node_id] = (x, y)
-            #print(f"Leído nodo: {node_id}, Coordenadas: ({x}, {y})")
-
-        #print("Leyendo DEMAND_SECTION")
-        for line in file:
-            line = line.strip()
-            if line == "DEPOT_SECTION":
-                break
-            node_id, demand = map(int, line.split())
-            instance.demands[node_id] = demand
-            #print(f"Leído nodo: {node_id}, Demanda: {demand}")
-
-        #print("Leyendo DEPOT_SECTION")
-        for line in file:
-            line = line.strip()
-            if line == "EOF":
-                break
-            if line != "-1":
-                instance.depot = int(line)
-                #
-                print(f"Leído depósito: {instance.depot}")
-
-    instance.calculate_distance_matrix()
-    return instance
\ No newline at end of file
+    parts = SECTION_PATTERN.split(read_instance_text(file_path))
+    parse_header(instance, parts[0])
+    sections = dict(zip(parts[1::2], parts[2::2]))
+
+    if "NODE_COORD_SECTION" in sections:
+        table = parse_table(sections["NODE_COORD_SECTION"], instance.dimension)
+        order = np.argsort(table[:, 0], kind='stable')
+        instance.coords = np.ascontiguousarray(table[order, 1:3])
+
+    if "DEMAND_SECTION" in sections:
+        table = parse_table(sections["DEMAND_SECTION"], instance.dimension)
+        order = np.argsort(table[:, 0], kind='stable')
+        instance.demand_array = table[order, 1].astype(np.int64)
+
+    if "DEPOT_SECTION" in sections:
+        depots = np.array(sections["DEPOT_SECTION"].split(), dtype=np.float64).astype(np.int64)
+        depots = depots[:np.argmax(depots == -1)] if (depots == -1).any() else depots
+        if len(depots):
+            instance.depot = int(depots[0])
+
+    if "EDGE_WEIGHT_SECTION" in sections:
+        weights = np.array(sections["EDGE_WEIGHT_SECTION"].split(), dtype=np.float64)
+        instance.distance_matrix = explicit_distance_matrix(weights, instance.dimension, instance.edge_weight_format)
+    elif lazy_distances:
+        instance.build_distance_oracle(max_cached_rows)
+    else:
+        instance.calculate_distance_matrix(cache_dir)
+    return instance
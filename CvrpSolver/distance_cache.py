@@ -0,0 +1,63 @@
+import hashlib
+import os
+import tempfile
+
+import numpy as np
+
+from distance_matrix import build_distance_matrix
+
+# Directorio por defecto de la caché; se puede cambiar con la variable de entorno CVRP_DISTANCE_CACHE.
+DEFAULT_CACHE_DIR = os.environ.get(
+    "CVRP_DISTANCE_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "cvrp_solver", "distances")
+)
+
+
+def distance_matrix_key(coords, edge_weight_type):
+    """
+    Calcula la clave de la caché a partir del contenido de la instancia.
+
+    Args:
+        coords: numpy.ndarray (n, 2) con las coordenadas de los nodos.
+        edge_weight_type: Tipo de peso de arista de la instancia.
+
+    Returns:
+        Hash hexadecimal de las coordenadas y del tipo de peso de arista.
+    """
+    coords = np.ascontiguousarray(coords, dtype=np.float64)
+    digest = hashlib.sha256()
+    digest.update(edge_weight_type.encode("utf-8"))
+    digest.update(np.int64(coords.shape[0]).tobytes())
+    digest.update(coords.tobytes())
+    return digest.hexdigest()
+
+
+def cached_distance_matrix(coords, edge_weight_type="", cache_dir=DEFAULT_CACHE_DIR):
+    """
+    Devuelve la matriz de distancias de las coordenadas, usando una caché en disco.
+
+    Las matrices se guardan como .npy y se abren con mmap_mode='r', de modo que
+    varios procesos que resuelven la misma instancia comparten las páginas a
+    través de la caché del sistema operativo en lugar de tener cada uno su copia.
+
+    Args:
+        coords: Secuencia o numpy.ndarray (n, 2) con las coordenadas, en el orden de los nodos.
+        edge_weight_type: Tipo de peso de arista de la instancia.
+        cache_dir: Directorio donde se guardan las matrices.
+
+    Returns:
+        numpy.memmap (n, n) de sólo lectura.
+    """
+    path = os.path.join(cache_dir, distance_matrix_key(coords, edge_weight_type) + ".npy")
+    if not os.path.exists(path):
+        matrix = build_distance_matrix(coords, edge_weight_type)
+        os.makedirs(cache_dir, exist_ok=True)
+        # Se escribe en un temporal y se renombra, para que ningún proceso lea un fichero a medias
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".npy.tmp")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                np.save(file, matrix)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    return np.load(path, mmap_mode="r")
@@ -0,0 +1,185 @@
+import numpy as np
+
+# Tamaño del bloque de filas con el que se recorre la mitad superior de la matriz.
+# Acota la memoria temporal a block_size * n elementos por paso.
+BLOCK_SIZE = 256
+
+# Constantes de la fórmula GEO de TSPLIB
+GEO_PI = 3.141592
+GEO_RRR = 6378.388
+
+
+def round_distances(distances, edge_weight_type):
+    """
+    Aplica, en el mismo array, el redondeo de TSPLIB que corresponde a edge_weight_type.
+
+    Args:
+        distances: numpy.ndarray de distancias euclidianas en float64.
+        edge_weight_type: "EUC_2D" (nint), "CEIL_2D" (techo) o cualquier otro valor (float sin redondear).
+
+    Returns:
+        El mismo array, redondeado.
+    """
+    if edge_weight_type == "EUC_2D":
+        # nint de TSPLIB: (int)(x + 0.5)
+        distances += 0.5
+        np.floor(distances, out=distances)
+    elif edge_weight_type == "CEIL_2D":
+        np.ceil(distances, out=distances)
+    return distances
+
+
+def geo_radians(coords):
+    """
+    Convierte coordenadas GEO de TSPLIB (formato DDD.MM) a radianes.
+    """
+    degrees = np.trunc(coords)
+    return GEO_PI * (degrees + 5.0 * (coords - degrees) / 3.0) / 180.0
+
+
+def geo_distances(lat_a, lon_a, lat_b, lon_b):
+    """
+    Fórmula GEO de TSPLIB (km sobre la esfera, truncados) sobre arrays en radianes que se combinan por broadcasting.
+    """
+    q1 = np.cos(lon_a - lon_b)
+    q2 = np.cos(lat_a - lat_b)
+    q3 = np.cos(lat_a + lat_b)
+    cosine = 0.5 * ((1.0 + q1) * q2 - (1.0 - q1) * q3)
+    np.clip(cosine, -1.0, 1.0, out=cosine)
+    distances = np.arccos(cosine, out=cosine)
+    distances *= GEO_RRR
+    distances += 1.0
+    return np.trunc(distances, out=distances)
+
+
+def geo_distance_block(coords_a, coords_b):
+    """
+    Calcula por broadcasting las distancias GEO de TSPLIB.
+
+    Args:
+        coords_a: numpy.ndarray (m, 2) con (latitud, longitud) en formato DDD.MM.
+        coords_b: numpy.ndarray (k, 2) con (latitud, longitud) en formato DDD.MM.
+
+    Returns:
+        numpy.ndarray (m, k) con las distancias. La diagonal no se anula aquí.
+    """
+    rad_a = geo_radians(coords_a)
+    rad_b = geo_radians(coords_b)
+    return geo_distances(rad_a[:, 0, None], rad_a[:, 1, None], rad_b[None, :, 0], rad_b[None, :, 1])
+
+
+def distance_block(coords_a, coords_b, edge_weight_type=""):
+    """
+    Calcula por broadcasting las distancias entre dos conjuntos de coordenadas.
+
+    Args:
+        coords_a: numpy.ndarray (m, 2) con las coordenadas de las filas.
+        coords_b: numpy.ndarray (k, 2) con las coordenadas de las columnas.
+        edge_weight_type: Tipo de peso de arista de la instancia.
+
+    Returns:
+        numpy.ndarray (m, k) con las distancias.
+    """
+    if edge_weight_type == "GEO":
+        return geo_distance_block(coords_a, coords_b)
+    dx = coords_a[:, 0, None] - coords_b[None, :, 0]
+    dy = coords_a[:, 1, None] - coords_b[None, :, 1]
+    distances = np.hypot(dx, dy, out=dx)
+    return round_distances(distances, edge_weight_type)
+
+
+def paired_distances(coords_a, coords_b, edge_weight_type=""):
+    """
+    Calcula elemento a elemento las distancias entre coords_a[k] y coords_b[k].
+
+    Returns:
+        numpy.ndarray (m,) con las distancias.
+    """
+    if edge_weight_type == "GEO":
+        rad_a = geo_radians(coords_a)
+        rad_b = geo_radians(coords_b)
+        distances = geo_distances(rad_a[:, 0], rad_a[:, 1], rad_b[:, 0], rad_b[:, 1])
+        distances[np.all(coords_a == coords_b, axis=1)] = 0.0
+        return distances
+    distances = np.hypot(coords_a[:, 0] - coords_b[:, 0], coords_a[:, 1] - coords_b[:, 1])
+    return round_distances(distances, edge_weight_type)
+
+
+def pair_distances(matrix, rows, cols):
+    """
+    Devuelve matrix[rows[k]][cols[k]] para cada k, sin recorrer la matriz en Python.
+
+    Args:
+        matrix: Matriz de distancias (ndarray, memmap, lista de listas o DistanceOracle).
+        rows: numpy.ndarray de índices (desde 0) de las filas.
+        cols: numpy.ndarray de índices (desde 0) de las columnas.
+
+    Returns:
+        numpy.ndarray de float64.
+    """
+    if hasattr(matrix, "pairs"):
+        return matrix.pairs(rows, cols)
+    return np.asarray(matrix, dtype=np.float64)[rows, cols]
+
+
+def build_distance_matrix(coords, edge_weight_type="", block_size=BLOCK_SIZE):
+    """
+    Construye la matriz de distancias completa en un ndarray contiguo.
+
+    Sólo se calcula la mitad superior (por bloques de filas) y se copia
+    transpuesta en la inferior, ya que la matriz es simétrica.
+
+    Args:
+        coords: Secuencia o numpy.ndarray (n, 2) con las coordenadas, en el orden de los nodos.
+        edge_weight_type: "EUC_2D", "CEIL_2D", "GEO" o cualquier otro valor para distancias en float.
+        block_size: Número de filas calculadas en cada paso.
+
+    Returns:
+        numpy.ndarray (n, n) de float64.
+    """
+    coords = np.ascontiguousarray(coords, dtype=np.float64)
+    num_nodes = len(coords)
+    matrix = np.empty((num_nodes, num_nodes), dtype=np.float64)
+    for start in range(0, num_nodes, block_size):
+        stop = min(start + block_size, num_nodes)
+        block = distance_block(coords[start:stop], coords[start:], edge_weight_type)
+        matrix[start:stop, start:] = block
+        matrix[start:, start:stop] = block.T
+    np.fill_diagonal(matrix, 0.0)
+    return matrix
+
+
+def distance_rows(matrix, start, stop):
+    """
+    Devuelve las filas [start, stop) de una matriz densa, memmap, lista de listas o DistanceOracle.
+    """
+    if hasattr(matrix, "block"):
+        return matrix.block(start, stop)
+    return np.array(matrix[start:stop], dtype=np.float64)
+
+
+def nearest_neighbors(matrix, k, block_size=BLOCK_SIZE):
+    """
+    Calcula, para cada nodo, sus k vecinos más cercanos ordenados por distancia.
+
+    Args:
+        matrix: Matriz de distancias (ndarray, memmap, lista de listas o DistanceOracle).
+        k: Número de vecinos por nodo. Se limita a n - 1.
+        block_size: Número de filas procesadas en cada paso.
+
+    Returns:
+        numpy.ndarray (n, k) de int32 con los índices (desde 0) de los vecinos, sin incluir al propio nodo.
+    """
+    num_nodes = len(matrix)
+    k = max(0, min(k, num_nodes - 1))
+    neighbors = np.empty((num_nodes, k), dtype=np.int32)
+    if k == 0:
+        return neighbors
+    for start in range(0, num_nodes, block_size):
+        stop = min(start + block_size, num_nodes)
+        rows = distance_rows(matrix, start, stop)
+        rows[np.arange(stop - start), np.arange(start, stop)] = np.inf
+        candidates = np.argpartition(rows, k - 1, axis=1)[:, :k]
+        order = np.argsort(np.take_along_axis(rows, candidates, axis=1), axis=1, kind='stable')
+        neighbors[start:stop] = np.take_along_axis(candidates, order, axis=1)
+    return neighbors
@@ -0,0 +1,104 @@
+import math
+from collections import OrderedDict
+
+import numpy as np
+
+from distance_matrix import distance_block, paired_distances
+
+# Filas completas que se mantienen en memoria como máximo.
+MAX_CACHED_ROWS = 512
+# Accesos escalares a una fila antes de calcularla entera y guardarla en la caché.
+PROMOTE_AFTER = 32
+
+
+class DistanceOracle:
+    """
+    Sustituto perezoso de la matriz de distancias para instancias grandes.
+
+    Sólo guarda las coordenadas y una caché LRU acotada de filas calientes.
+    Admite el mismo acceso distancias[i][j] que una matriz densa: las filas en
+    caché se devuelven como numpy.ndarray y el resto como una fila perezosa que
+    calcula cada distancia a partir de las coordenadas.
+    """
+
+    def __init__(self, coords, edge_weight_type="", max_cached_rows=MAX_CACHED_ROWS, promote_after=PROMOTE_AFTER):
+        self.coords = np.ascontiguousarray(coords, dtype=np.float64)
+        self.edge_weight_type = edge_weight_type
+        self.max_cached_rows = max_cached_rows
+        self.promote_after = promote_after
+        self._xs = self.coords[:, 0].tolist()
+        self._ys = self.coords[:, 1].tolist()
+        self._rows = OrderedDict()
+        self._misses = [0] * len(self.coords)
+
+    def __len__(self):
+        return len(self.coords)
+
+    def __getitem__(self, i):
+        row = self._rows.get(i)
+        if row is not None:
+            self._rows.move_to_end(i)
+            return row
+        self._misses[i] += 1
+        if self._misses[i] >= self.promote_after:
+            return self.row(i)
+        return _LazyRow(self, i)
+
+    def row(self, i):
+        """
+        Devuelve la fila i completa como numpy.ndarray, guardándola en la caché LRU.
+        """
+        row = self._rows.get(i)
+        if row is not None:
+            self._rows.move_to_end(i)
+            return row
+        row = distance_block(self.coords[i:i + 1], self.coords, self.edge_weight_type)[0]
+        row[i] = 0.0
+        self._rows[i] = row
+        self._misses[i] = 0
+        if len(self._rows) > self.max_cached_rows:
+            self._rows.popitem(last=False)
+        return row
+
+    def block(self, start, stop):
+        """
+        Calcula las filas [start, stop) sin guardarlas en la caché.
+        """
+        rows = distance_block(self.coords[start:stop], self.coords, self.edge_weight_type)
+        rows[np.arange(stop - start), np.arange(start, stop)] = 0.0
+        return rows
+
+    def pairs(self, rows, cols):
+        """
+        Calcula elemento a elemento las distancias entre los nodos rows[k] y cols[k].
+        """
+        return paired_distances(self.coords[rows], self.coords[cols], self.edge_weight_type)
+
+    def distance(self, i, j):
+        """
+        Calcula la distancia entre los nodos i y j (índices desde 0) a partir de las coordenadas.
+        """
+        if self.edge_weight_type == "GEO":
+            if i == j:
+                return 0.0
+            return float(distance_block(self.coords[i:i + 1], self.coords[j:j + 1], self.edge_weight_type)[0, 0])
+        distance = math.hypot(self._xs[i] - self._xs[j], self._ys[i] - self._ys[j])
+        if self.edge_weight_type == "EUC_2D":
+            return float(math.floor(distance + 0.5))
+        if self.edge_weight_type == "CEIL_2D":
+            return float(math.ceil(distance))
+        return distance
+
+
+class _LazyRow:
+    __slots__ = ("oracle", "i")
+
+    def __init__(self, oracle, i):
+        self.oracle = oracle
+        self.i = i
+
+    def __len__(self):
+        return len(self.oracle)
+
+    def __getitem__(self, j):
+        return self.oracle.distance(self.i, j)
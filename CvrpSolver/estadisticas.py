@@ -0,0 +1,67 @@
+import time
+from contextlib import contextmanager
+
+# Fases de CVRP.resolver
+FASE_CONSTRUCCION = "construccion"
+FASE_INTRA_RUTA = "intra_ruta"
+FASE_ENTRE_RUTAS = "entre_rutas"
+FASE_FUSION = "fusion"
+
+
+class Estadisticas:
+    """
+    Contadores de una resolución: segundos por fase y, por operador, llamadas,
+    segundos, movimientos evaluados y aceptados y mejora total del coste.
+
+    El solver sólo crea este objeto si se piden estadísticas; sin él, los
+    operadores no toman tiempos ni calculan costes adicionales.
+    """
+
+    def __init__(self):
+        self.fases = {}
+        self.operadores = {}
+
+    def reiniciar(self):
+        self.fases.clear()
+        self.operadores.clear()
+
+    @contextmanager
+    def fase(self, nombre):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.fases[nombre] = self.fases.get(nombre, 0.0) + time.perf_counter() - inicio
+
+    def operador(self, nombre):
+        contadores = self.operadores.get(nombre)
+        if contadores is None:
+            contadores = self.operadores[nombre] = {"llamadas": 0, "segundos": 0.0, "evaluados": 0,
+                                                    "aceptados": 0, "mejora": 0.0}
+        return contadores
+
+    def registrar_llamada(self, nombre, segundos, mejora):
+        contadores = self.operador(nombre)
+        contadores["llamadas"] += 1
+        contadores["segundos"] += segundos
+        contadores["mejora"] += mejora
+
+    def contar(self, nombre, evaluados, aceptados):
+        contadores = self.operador(nombre)
+        contadores["evaluados"] += evaluados
+        contadores["aceptados"] += aceptados
+
+    def como_diccionario(self):
+        return {"fases": dict(self.fases), "operadores": {nombre: dict(contadores)
+                                                         for nombre, contadores in self.operadores.items()}}
+
+    def informe(self):
+        lineas = ["Tiempo por fase:"]
+        for nombre, segundos in self.fases.items():
+            lineas.append(f"  {nombre:<14}{segundos:>10.4f} s")
+        lineas.append("Operadores:")
+        lineas.append(f"  {'':<32}{'llamadas':>9}{'segundos':>10}{'evaluados':>12}{'aceptados':>10}{'mejora':>12}")
+        for nombre, contadores in self.operadores.items():
+            lineas.append(f"  {nombre:<32}{contadores['llamadas']:>9}{contadores['segundos']:>10.4f}"
+                          f"{contadores['evaluados']:>12}{contadores['aceptados']:>10}{contadores['mejora']:>12.2f}")
+        return "\n".join(lineas)
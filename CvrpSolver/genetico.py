@@ -0,0 +1,316 @@
+from collections import deque
+
+import numpy as np
+
+from cvrp import EPSILON, MOTIVO_ITERACIONES, MOTIVO_OBJETIVO, MOTIVO_SIN_MEJORA
+from distance_matrix import pair_distances
+from metaheuristicas import descenso
+
+# Parámetros por defecto de la búsqueda genética híbrida
+TAMANO_POBLACION = 25
+TAMANO_GENERACION = 40
+NUM_ELITE = 4
+NUM_CERCANOS = 5
+
+# Los grandes tours son permutaciones de los clientes con índices de la matriz (desde 0, depósito = 0),
+# como en construccion.py; las rutas se devuelven con la numeración del solver (desde 1).
+
+
+def dividir_gran_tour(tour, distancias, demandas, capacidad):
+    """
+    Split en tiempo lineal: parte un gran tour en rutas que respetan la capacidad
+    con el menor coste total, manteniendo el orden de los clientes.
+
+    p[j] = min p[i] + d(0, t[i+1]) + D[j] - D[i+1] + d(t[j], 0) sobre los i con
+    Q[j] - Q[i] <= capacidad, donde D y Q son las distancias y demandas acumuladas
+    a lo largo del tour. Como la ventana de i factibles sólo avanza, el mínimo se
+    mantiene con una cola monótona y cada cliente entra y sale de ella una vez.
+
+    Args:
+        tour: Secuencia de clientes (índices desde 0, sin el depósito).
+        distancias: Matriz de distancias.
+        demandas: Demanda de cada nodo (índices desde 0).
+        capacidad: Capacidad del vehículo.
+
+    Returns:
+        Lista de rutas (listas de nodos desde 1, con el depósito en los extremos).
+    """
+    tour = np.asarray(tour, dtype=np.int64)
+    num_clientes = len(tour)
+    if num_clientes == 0:
+        return []
+    # Posiciones desde 1: t[k] = tour[k - 1]
+    al_deposito = [0.0] + pair_distances(distancias, np.zeros_like(tour), tour).tolist()
+    recorrido = np.zeros(num_clientes + 1)
+    recorrido[2:] = np.cumsum(pair_distances(distancias, tour[:-1], tour[1:]))
+    acumulada = np.zeros(num_clientes + 1, dtype=np.int64)
+    acumulada[1:] = np.cumsum(np.asarray(demandas, dtype=np.int64)[tour])
+    if int(np.max(acumulada[1:] - acumulada[:-1])) > capacidad:
+        raise ValueError("Hay clientes con demanda mayor que la capacidad del vehículo")
+    recorrido = recorrido.tolist()
+    acumulada = acumulada.tolist()
+
+    potencial = [0.0] * (num_clientes + 1)
+    predecesor = [0] * (num_clientes + 1)
+    # Valor de empezar una ruta justo después de la posición i
+    inicio = [potencial[0] + al_deposito[1] - recorrido[1]]
+    cola = deque([0])
+    for j in range(1, num_clientes + 1):
+        frente = cola[0]
+        potencial[j] = inicio[frente] + recorrido[j] + al_deposito[j]
+        predecesor[j] = frente
+        if j < num_clientes:
+            inicio.append(potencial[j] + al_deposito[j + 1] - recorrido[j + 1])
+            while cola and inicio[cola[-1]] >= inicio[j]:
+                cola.pop()
+            cola.append(j)
+            while acumulada[j + 1] - acumulada[cola[0]] > capacidad:
+                cola.popleft()
+
+    rutas = []
+    j = num_clientes
+    clientes = (tour + 1).tolist()
+    while j > 0:
+        i = predecesor[j]
+        rutas.append([1] + clientes[i:j] + [1])
+        j = i
+    rutas.reverse()
+    return rutas
+
+
+def gran_tour(rutas, salida=None):
+    # Concatena los clientes de las rutas en un gran tour (índices desde 0)
+    clientes = np.fromiter((nodo - 1 for ruta in rutas for nodo in ruta[1:-1]), dtype=np.int32)
+    if salida is None:
+        return clientes
+    salida[:] = clientes
+    return salida
+
+
+def enlaces_solucion(rutas, sucesores, predecesores):
+    # Sucesor y predecesor de cada cliente en la solución (índices desde 0, depósito = 0)
+    for ruta in rutas:
+        nodos = ruta.nodos if hasattr(ruta, "nodos") else ruta
+        for p in range(1, len(nodos) - 1):
+            cliente = nodos[p] - 1
+            sucesores[cliente] = nodos[p + 1] - 1
+            predecesores[cliente] = nodos[p - 1] - 1
+
+
+def cruce_ox(padre1, padre2, aleatorio, salida):
+    """
+    Cruce de orden (OX): copia un tramo de padre1 y completa el resto con los
+    clientes de padre2 en su orden, empezando tras el final del tramo.
+    """
+    num_clientes = len(padre1)
+    inicio = aleatorio.randrange(num_clientes)
+    fin = aleatorio.randrange(num_clientes)
+    if fin < inicio:
+        inicio, fin = fin, inicio
+    tramo = padre1[inicio:fin + 1]
+    en_tramo = np.zeros(num_clientes + 1, dtype=bool)
+    en_tramo[tramo] = True
+    resto = np.roll(padre2, -(fin + 1))
+    resto = resto[~en_tramo[resto]]
+    salida[inicio:fin + 1] = tramo
+    salida[(np.arange(len(resto)) + fin + 1) % num_clientes] = resto
+    return salida
+
+
+class Poblacion:
+    """
+    Población de individuos guardada en arrays de NumPy reservados una sola vez.
+
+    Cada individuo ocupa una fila: su gran tour, el sucesor y el predecesor de cada
+    cliente en sus rutas (para la distancia de parejas rotas) y su coste. La matriz
+    distancias guarda la distancia de parejas rotas entre cada par de individuos y
+    se actualiza con una fila vectorizada al añadir uno. Los individuos eliminados
+    se sustituyen por el último, así las filas ocupadas son siempre 0..tamano-1.
+
+    huellas guarda la huella (ver CVRP.huella) de cada individuo y el conjunto
+    vistas las de toda la población, para descartar clones en O(1) antes de
+    calcular sus enlaces y distancias.
+    """
+
+    def __init__(self, capacidad, num_nodos):
+        self.capacidad = capacidad
+        self.num_nodos = num_nodos
+        self.tours = np.zeros((capacidad, num_nodos - 1), dtype=np.int32)
+        self.sucesores = np.zeros((capacidad, num_nodos), dtype=np.int32)
+        self.predecesores = np.zeros((capacidad, num_nodos), dtype=np.int32)
+        self.costes = np.zeros(capacidad)
+        self.distancias = np.zeros((capacidad, capacidad))
+        self.huellas = [0] * capacidad
+        self.vistas = set()
+        self.tamano = 0
+
+    def distancia_parejas_rotas(self, sucesores, predecesores):
+        # Fracción de clientes cuyas aristas no están en cada individuo de la población
+        otros_sucesores = self.sucesores[:self.tamano, 1:]
+        otros_predecesores = self.predecesores[:self.tamano, 1:]
+        sucesores, predecesores = sucesores[1:], predecesores[1:]
+        rotas = (sucesores != otros_sucesores) & (sucesores != otros_predecesores)
+        rotas |= (predecesores == 0) & (otros_predecesores != 0) & (otros_sucesores != 0)
+        return np.count_nonzero(rotas, axis=1) / (self.num_nodos - 1)
+
+    def agregar(self, rutas, coste, huella):
+        indice = self.tamano
+        sucesores = self.sucesores[indice]
+        predecesores = self.predecesores[indice]
+        enlaces_solucion(rutas, sucesores, predecesores)
+        gran_tour(rutas, self.tours[indice])
+        distancias = self.distancia_parejas_rotas(sucesores, predecesores)
+        self.distancias[indice, :indice] = distancias[:indice]
+        self.distancias[:indice, indice] = distancias[:indice]
+        self.distancias[indice, indice] = 0.0
+        self.costes[indice] = coste
+        self.huellas[indice] = huella
+        self.vistas.add(huella)
+        self.tamano += 1
+        return indice
+
+    def eliminar(self, indice):
+        ultimo = self.tamano - 1
+        self.vistas.discard(self.huellas[indice])
+        if indice != ultimo:
+            for array in (self.tours, self.sucesores, self.predecesores, self.costes, self.huellas):
+                array[indice] = array[ultimo]
+            self.distancias[indice, :] = self.distancias[ultimo, :]
+            self.distancias[:, indice] = self.distancias[:, ultimo]
+            self.distancias[indice, indice] = 0.0
+        self.tamano = ultimo
+
+    def aptitud_sesgada(self, num_elite, num_cercanos):
+        """
+        Aptitud de cada individuo combinando su puesto por coste y por diversidad
+        (distancia media a sus num_cercanos individuos más próximos). Menor es mejor.
+        """
+        tamano = self.tamano
+        if tamano <= 1:
+            return np.zeros(tamano)
+        distancias = self.distancias[:tamano, :tamano].copy()
+        np.fill_diagonal(distancias, np.inf)
+        cercanos = min(num_cercanos, tamano - 1)
+        diversidad = np.partition(distancias, cercanos - 1, axis=1)[:, :cercanos].mean(axis=1)
+        puesto_coste = np.empty(tamano)
+        puesto_coste[np.argsort(self.costes[:tamano], kind='stable')] = np.arange(tamano) / (tamano - 1)
+        puesto_diversidad = np.empty(tamano)
+        puesto_diversidad[np.argsort(-diversidad, kind='stable')] = np.arange(tamano) / (tamano - 1)
+        return puesto_coste + (1.0 - min(num_elite, tamano) / tamano) * puesto_diversidad
+
+    def seleccionar_supervivientes(self, tamano, num_elite, num_cercanos):
+        # Elimina primero los clones y después los de peor aptitud sesgada hasta dejar tamano individuos
+        while self.tamano > tamano:
+            ocupados = self.tamano
+            distancias = self.distancias[:ocupados, :ocupados] + np.eye(ocupados)
+            clones = np.flatnonzero((distancias <= EPSILON).any(axis=1))
+            if len(clones):
+                self.eliminar(int(clones[np.argmax(self.costes[clones])]))
+            else:
+                self.eliminar(int(np.argmax(self.aptitud_sesgada(num_elite, num_cercanos))))
+
+    def torneo(self, aptitud, aleatorio):
+        # Torneo binario sobre la aptitud sesgada
+        a = aleatorio.randrange(self.tamano)
+        b = aleatorio.randrange(self.tamano)
+        return a if aptitud[a] <= aptitud[b] else b
+
+
+def _educar(solver, tour):
+    # Split del gran tour y búsqueda local del solver sobre las rutas resultantes
+    solver.rutas = [solver.nueva_ruta(nodos) for nodos in
+                    dividir_gran_tour(tour, solver.distancias, solver.demandas, solver.capacidad_vehiculo)]
+    return descenso(solver)
+
+
+def busqueda_genetica_hibrida(solver, iteraciones=None, tiempo_limite=None, max_iteraciones_sin_mejora=None,
+                              objetivo=None, tamano_poblacion=TAMANO_POBLACION,
+                              tamano_generacion=TAMANO_GENERACION, num_elite=NUM_ELITE, num_cercanos=NUM_CERCANOS):
+    """
+    Búsqueda genética híbrida sobre grandes tours.
+
+    Cada hijo se obtiene por cruce OX de dos padres elegidos por torneo binario,
+    se parte en rutas con dividir_gran_tour y se mejora con la búsqueda local de
+    solver. La población crece hasta tamano_poblacion + tamano_generacion y
+    entonces se reduce a tamano_poblacion quitando clones y los individuos de peor
+    aptitud sesgada (coste y diversidad por distancia de parejas rotas).
+
+    Args:
+        solver: CVRP ya configurado (conviene usar k_vecinos); su generador aleatorio guía la búsqueda.
+        iteraciones: Número máximo de hijos, o None.
+        tiempo_limite: Segundos disponibles, o None.
+        max_iteraciones_sin_mejora: Hijos seguidos sin mejorar la mejor solución, o None.
+        objetivo: Coste con el que se da por terminada la búsqueda, o None. No basta solo:
+            hace falta también iteraciones, tiempo_limite o max_iteraciones_sin_mejora.
+        tamano_poblacion: Individuos que sobreviven a cada selección.
+        tamano_generacion: Hijos que se añaden antes de cada selección.
+        num_elite: Individuos que la aptitud sesgada protege por su coste.
+        num_cercanos: Individuos más próximos con los que se mide la diversidad.
+
+    Returns:
+        Lista de rutas con la mejor solución encontrada (también queda en solver.rutas).
+    """
+    if iteraciones is None and tiempo_limite is None and max_iteraciones_sin_mejora is None:
+        # El objetivo puede no alcanzarse nunca, así que no basta como único criterio
+        raise ValueError("Hace falta iteraciones, tiempo_limite o max_iteraciones_sin_mejora")
+    solver.iniciar_parada(tiempo_limite, objetivo)
+    aleatorio = solver.aleatorio
+    generador = np.random.default_rng(aleatorio.getrandbits(64))
+    num_nodos = solver.num_clientes
+    poblacion = Poblacion(tamano_poblacion + tamano_generacion, num_nodos)
+    hijo = np.empty(num_nodos - 1, dtype=np.int32)
+    mejor_coste = float('inf')
+    mejores_rutas = []
+
+    def incorporar(coste):
+        nonlocal mejor_coste, mejores_rutas
+        huella = solver.huella()
+        if huella in poblacion.vistas:
+            return False  # Clon de un individuo de la población
+        if poblacion.tamano == poblacion.capacidad:
+            poblacion.seleccionar_supervivientes(tamano_poblacion, num_elite, num_cercanos)
+        poblacion.agregar(solver.rutas, coste, huella)
+        if coste < mejor_coste - EPSILON:
+            mejor_coste = coste
+            mejores_rutas = [ruta.copia() for ruta in solver.rutas]
+            solver.anotar_incumbente(mejor_coste, "genetico")
+            return True
+        return False
+
+    # Población inicial: tours aleatorios mejorados
+    for _ in range(tamano_poblacion):
+        if poblacion.tamano and solver.debe_parar():
+            break
+        incorporar(_educar(solver, generador.permutation(np.arange(1, num_nodos, dtype=np.int32))))
+
+    iteracion = 0
+    sin_mejora = 0
+    aptitud = poblacion.aptitud_sesgada(num_elite, num_cercanos)
+    while True:
+        motivo = None
+        if objetivo is not None and mejor_coste <= objetivo:
+            motivo = MOTIVO_OBJETIVO
+        elif iteraciones is not None and iteracion >= iteraciones:
+            motivo = MOTIVO_ITERACIONES
+        elif max_iteraciones_sin_mejora is not None and sin_mejora >= max_iteraciones_sin_mejora:
+            motivo = MOTIVO_SIN_MEJORA
+        elif solver.debe_parar():
+            motivo = solver.motivo_parada
+        if motivo is not None:
+            break
+
+        padre1 = poblacion.tours[poblacion.torneo(aptitud, aleatorio)]
+        padre2 = poblacion.tours[poblacion.torneo(aptitud, aleatorio)]
+        iteracion += 1
+        solver.iteracion = iteracion
+        cruce_ox(padre1, padre2, aleatorio, hijo)
+        coste = _educar(solver, hijo)
+        if solver.detenido and coste >= mejor_coste:
+            continue
+        sin_mejora = 0 if incorporar(coste) else sin_mejora + 1
+        aptitud = poblacion.aptitud_sesgada(num_elite, num_cercanos)
+
+    solver.rutas = mejores_rutas
+    solver.finalizar_parada()
+    solver.motivo_parada = motivo
+    return solver.rutas
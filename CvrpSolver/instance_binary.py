@@ -0,0 +1,124 @@
+import argparse
+import glob
+import os
+
+import numpy as np
+
+from cvrp_instance import CVRPInstance, read_cvrp_instance
+from distance_matrix import nearest_neighbors
+
+BINARY_EXTENSION = ".npz"
+FORMAT_VERSION = 1
+
+
+def save_instance_binary(instance, path, include_matrix=False, num_neighbors=0):
+    """
+    Guarda una instancia en el formato binario (.npz sin comprimir).
+
+    Args:
+        instance: CVRPInstance a guardar.
+        path: Ruta del fichero de salida.
+        include_matrix: Si es True, guarda también la matriz de distancias precalculada.
+        num_neighbors: Si es mayor que 0, guarda las listas de los num_neighbors vecinos más cercanos.
+    """
+    arrays = {
+        "format_version": np.int64(FORMAT_VERSION),
+        "name": np.str_(instance.name),
+        "comment": np.str_(instance.comment),
+        "type": np.str_(instance.type),
+        "edge_weight_type": np.str_(instance.edge_weight_type),
+        "edge_weight_format": np.str_(instance.edge_weight_format),
+        "no_of_trucks": np.int64(instance.no_of_trucks),
+        "optimal_value": np.int64(instance.optimal_value),
+        "dimension": np.int64(instance.dimension),
+        "capacity": np.int64(instance.capacity),
+        "depot": np.int64(instance.depot),
+        "demands": np.asarray(instance.demand_array if instance.demand_array is not None
+                              else [instance.demands[i] for i in range(1, instance.dimension + 1)], dtype=np.int64),
+    }
+    coords = instance.coords_array()
+    if coords is not None:
+        arrays["coords"] = np.ascontiguousarray(coords, dtype=np.float64)
+    # Las instancias EXPLICIT no tienen coordenadas: su matriz se guarda siempre
+    if include_matrix or coords is None:
+        arrays["distance_matrix"] = np.ascontiguousarray(instance.distance_matrix, dtype=np.float64)
+    if num_neighbors > 0:
+        arrays["neighbors"] = nearest_neighbors(instance.distance_matrix, num_neighbors)
+    with open(path, "wb") as file:
+        np.savez(file, **arrays)
+
+
+def load_instance_binary(path, calculate_matrix=True):
+    """
+    Carga una instancia guardada con save_instance_binary sin parsear texto.
+
+    Devuelve un CVRPInstance respaldado por arrays: coords, demand_array,
+    distance_matrix y neighbors (si estaban guardados). node_coords y demands
+    sólo se construyen como diccionarios si alguien los pide.
+
+    Args:
+        path: Ruta del fichero .npz.
+        calculate_matrix: Si el fichero no trae matriz, calcularla a partir de las coordenadas.
+
+    Returns:
+        CVRPInstance.
+    """
+    instance = CVRPInstance()
+    with np.load(path) as data:
+        if int(data["format_version"]) != FORMAT_VERSION:
+            raise ValueError(f"Versión de formato binario no soportada: {int(data['format_version'])}")
+        instance.name = str(data["name"])
+        instance.comment = str(data["comment"])
+        instance.type = str(data["type"])
+        instance.edge_weight_type = str(data["edge_weight_type"])
+        instance.edge_weight_format = str(data["edge_weight_format"])
+        instance.no_of_trucks = int(data["no_of_trucks"])
+        instance.optimal_value = int(data["optimal_value"])
+        instance.dimension = int(data["dimension"])
+        instance.capacity = int(data["capacity"])
+        instance.depot = int(data["depot"])
+        instance.demand_array = data["demands"]
+        if "coords" in data:
+            instance.coords = data["coords"]
+        if "neighbors" in data:
+            instance.neighbors = data["neighbors"]
+        if "distance_matrix" in data:
+            instance.distance_matrix = data["distance_matrix"]
+        elif calculate_matrix:
+            instance.calculate_distance_matrix()
+    return instance
+
+
+def convert_instances(paths, output_dir=None, include_matrix=False, num_neighbors=0):
+    """
+    Convierte ficheros TSPLIB/CVRPLIB al formato binario.
+
+    Returns:
+        Lista con las rutas de los ficheros generados.
+    """
+    output_paths = []
+    for path in paths:
+        instance = read_cvrp_instance(path)
+        stem = os.path.basename(path)
+        for extension in (".gz", ".txt", ".vrp"):
+            if stem.endswith(extension):
+                stem = stem[:-len(extension)]
+        output_path = os.path.join(output_dir or os.path.dirname(path), stem + BINARY_EXTENSION)
+        save_instance_binary(instance, output_path, include_matrix, num_neighbors)
+        output_paths.append(output_path)
+    return output_paths
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convierte instancias TSPLIB/CVRPLIB al formato binario .npz")
+    parser.add_argument("paths", nargs="+", help="Ficheros o patrones glob, p. ej. 'instances/*.txt'")
+    parser.add_argument("-o", "--output-dir", help="Directorio de salida (por defecto, junto a cada fichero)")
+    parser.add_argument("--matrix", action="store_true", help="Guardar la matriz de distancias precalculada")
+    parser.add_argument("--neighbors", type=int, default=0, help="Guardar las listas de los k vecinos más cercanos")
+    args = parser.parse_args()
+
+    paths = sorted(path for pattern in args.paths for path in (glob.glob(pattern) or [pattern]))
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+    for output_path in convert_instances(paths, args.output_dir, args.matrix, args.neighbors):
+        print(f"Generado: {output_path}")
@@ -0,0 +1,300 @@
+import math
+import time
+
+import numpy as np
+
+from cvrp import EPSILON, MOTIVO_ITERACIONES, MOTIVO_OBJETIVO, MOTIVO_SIN_MEJORA
+from distance_matrix import distance_rows, pair_distances
+from metaheuristicas import ENFRIAMIENTOS, ENFRIAMIENTO_GEOMETRICO, FRACCION_TEMPERATURA_FINAL, nueva_visita
+from ruta import deshacer_cambios
+
+ELIMINACION_ALEATORIA = "aleatoria"
+ELIMINACION_RADIAL = "radial"
+ELIMINACION_CADENAS = "cadenas"
+
+# Inserción codiciosa (k = 1) y con arrepentimiento de orden 2 y 3
+ORDENES_ARREPENTIMIENTO = (1, 2, 3)
+
+# Clientes eliminados en cada iteración: entre un mínimo y una fracción del total (al menos el doble del mínimo)
+MIN_ELIMINADOS = 5
+FRACCION_ELIMINADOS = 0.15
+MAX_ELIMINADOS = 100
+# Longitud media de las cadenas de la eliminación por cadenas
+LONGITUD_CADENA = 10
+# Temperatura inicial del criterio de aceptación, como fracción del coste medio por cliente
+FRACCION_TEMPERATURA_INICIAL = 0.05
+
+
+def _distancias_pares(distancias, filas, columnas):
+    # Como pair_distances, pero con filas y columnas que se combinan por broadcasting
+    filas, columnas = np.broadcast_arrays(filas, columnas)
+    return pair_distances(distancias, filas.ravel(), columnas.ravel()).reshape(filas.shape)
+
+
+def eliminacion_aleatoria(solver, num, aleatorio):
+    return aleatorio.sample(range(2, solver.num_clientes + 1), num)
+
+
+def eliminacion_radial(solver, num, aleatorio):
+    # Un cliente al azar y sus num - 1 clientes más cercanos
+    semilla = aleatorio.randrange(2, solver.num_clientes + 1)
+    fila = np.asarray(distance_rows(solver.distancias, semilla - 1, semilla)[0], dtype=np.float64).copy()
+    fila[0] = np.inf
+    cercanos = np.argpartition(fila, num - 1)[:num]
+    clientes = (cercanos + 1).tolist()
+    if semilla not in clientes:
+        clientes[-1] = semilla
+    return clientes
+
+
+def eliminacion_cadenas(solver, num, aleatorio):
+    # Quita tramos consecutivos de varias rutas, recorriendo los vecinos de un cliente al azar
+    semilla = aleatorio.randrange(2, solver.num_clientes + 1)
+    fila = np.asarray(distance_rows(solver.distancias, semilla - 1, semilla)[0], dtype=np.float64)
+    orden = (np.argsort(fila, kind='stable') + 1).tolist()
+    ruta_de = solver.indexar_rutas()
+    arruinadas = set()
+    eliminados = []
+    for cliente in orden:
+        if len(eliminados) >= num:
+            break
+        ruta = ruta_de.get(cliente)
+        if ruta is None or id(ruta) in arruinadas:
+            continue
+        arruinadas.add(id(ruta))
+        clientes = ruta.clientes()
+        longitud = min(len(clientes), num - len(eliminados), aleatorio.randint(1, 2 * LONGITUD_CADENA - 1))
+        posicion = clientes.index(cliente)
+        inicio = max(0, min(posicion - aleatorio.randrange(longitud), len(clientes) - longitud))
+        eliminados.extend(clientes[inicio:inicio + longitud])
+    return eliminados
+
+
+ELIMINACIONES = {
+    ELIMINACION_ALEATORIA: eliminacion_aleatoria,
+    ELIMINACION_RADIAL: eliminacion_radial,
+    ELIMINACION_CADENAS: eliminacion_cadenas,
+}
+
+
+def quitar_clientes(solver, clientes):
+    # Quita los clientes de sus rutas; las rutas que quedan vacías se mantienen hasta la reinserción
+    ruta_de = solver.indexar_rutas()
+    tocadas = {}
+    for cliente in clientes:
+        ruta = ruta_de[cliente]
+        ruta.eliminar(ruta.nodos.index(cliente))
+        tocadas[id(ruta)] = ruta
+    return list(tocadas.values())
+
+
+def insertar_clientes(solver, clientes, k=1, diario=None):
+    """
+    Reinserta clientes con inserción codiciosa (k = 1) o con arrepentimiento de orden k.
+
+    Para cada cliente pendiente y cada ruta se guarda el coste de su mejor
+    inserción y la posición. El coste de insertar todos los pendientes en todas
+    las aristas de una ruta se calcula con una sola expresión de NumPy, y la
+    capacidad se comprueba a la vez para toda la columna. Tras cada inserción
+    sólo se recalcula la columna de la ruta modificada. Siempre se puede abrir
+    una ruta nueva (la última columna).
+
+    Con k > 1 se inserta primero el cliente con mayor arrepentimiento: la suma
+    de lo que empeora su inserción en sus k - 1 siguientes mejores rutas
+    respecto a la mejor.
+
+    Args:
+        solver: CVRP con las rutas en las que insertar.
+        clientes: Clientes pendientes (numerados desde 1).
+        k: Orden del arrepentimiento.
+        diario: Diario que se asigna a las rutas nuevas, si se está anotando (ver Ruta).
+
+    Returns:
+        Lista de las rutas modificadas.
+    """
+    distancias = solver.distancias
+    capacidad = solver.capacidad_vehiculo
+    pendientes = np.asarray(clientes, dtype=np.int64) - 1
+    demandas = np.asarray(solver.demandas, dtype=np.int64)[pendientes]
+    rutas = solver.rutas
+    num_rutas = len(rutas)
+    costes = np.empty((len(pendientes), num_rutas + 1))
+    posiciones = np.zeros((len(pendientes), num_rutas), dtype=np.int64)
+    # Coste de abrir una ruta nueva para cada cliente
+    costes[:, num_rutas] = 2 * pair_distances(distancias, np.zeros_like(pendientes), pendientes)
+
+    def calcular_columna(r):
+        nodos = np.asarray(rutas[r].nodos, dtype=np.int64) - 1
+        origen, destino = nodos[:-1], nodos[1:]
+        cliente = pendientes[:, None]
+        insercion = (_distancias_pares(distancias, cliente, origen[None, :])
+                     + _distancias_pares(distancias, cliente, destino[None, :])
+                     - pair_distances(distancias, origen, destino)[None, :])
+        mejor = np.argmin(insercion, axis=1)
+        columna = insercion[np.arange(len(pendientes)), mejor]
+        columna[rutas[r].carga + demandas > capacidad] = np.inf
+        costes[:, r] = columna
+        posiciones[:, r] = mejor + 1
+
+    for r in range(num_rutas):
+        calcular_columna(r)
+
+    modificadas = {}
+    while len(pendientes):
+        if k > 1 and costes.shape[1] > 1:
+            ordenados = np.partition(costes, min(k, costes.shape[1]) - 1, axis=1)[:, :k]
+            ordenados.sort(axis=1)
+            mejores = ordenados[:, 0]
+            # Las rutas sin hueco cuentan como un empeoramiento muy grande pero finito
+            siguientes = np.where(np.isfinite(ordenados[:, 1:]), ordenados[:, 1:], mejores[:, None] + 1e12)
+            arrepentimiento = (siguientes - mejores[:, None]).sum(axis=1)
+            elegido = int(np.lexsort((mejores, -arrepentimiento))[0])
+        else:
+            elegido = int(np.argmin(costes.min(axis=1)))
+        r = int(np.argmin(costes[elegido]))
+        cliente = int(pendientes[elegido]) + 1
+        if r == num_rutas:
+            # Si se deshacen los cambios, la ruta nueva desaparece al restaurar la lista de rutas
+            ruta = solver.nueva_ruta([1, cliente, 1])
+            ruta.diario = diario
+            rutas.append(ruta)
+            costes = np.insert(costes, num_rutas, np.inf, axis=1)
+            posiciones = np.insert(posiciones, num_rutas, 0, axis=1)
+            num_rutas += 1
+        else:
+            ruta = rutas[r]
+            ruta.insertar(int(posiciones[elegido, r]), cliente)
+        modificadas[id(ruta)] = ruta
+        conservar = np.arange(len(pendientes)) != elegido
+        pendientes, demandas = pendientes[conservar], demandas[conservar]
+        costes, posiciones = costes[conservar], posiciones[conservar]
+        if len(pendientes):
+            calcular_columna(r)
+            costes[:, num_rutas] = 2 * pair_distances(distancias, np.zeros_like(pendientes), pendientes)
+    return list(modificadas.values())
+
+
+def busqueda_vecindario_grande(solver, iteraciones=None, tiempo_limite=None, max_iteraciones_sin_mejora=None,
+                               objetivo=None, eliminaciones=tuple(ELIMINACIONES), ordenes=ORDENES_ARREPENTIMIENTO,
+                               min_eliminados=MIN_ELIMINADOS, max_eliminados=None, temperatura_inicial=None,
+                               temperatura_final=None, enfriamiento=ENFRIAMIENTO_GEOMETRICO):
+    """
+    Búsqueda en vecindario grande (destruir y reconstruir).
+
+    En cada iteración se quitan entre min_eliminados y max_eliminados clientes con
+    un operador de eliminación al azar (aleatoria, radial o por cadenas), se
+    reinsertan con inserción codiciosa o con arrepentimiento de orden k y se
+    mejoran con 2-opt las rutas tocadas. La nueva solución se acepta con el
+    criterio del recocido simulado; si se rechaza, se deshacen sus movimientos con
+    el diario de las rutas en lugar de restaurar una copia.
+
+    Continúa desde solver.rutas (si está vacío, resuelve primero con resolver).
+
+    Args:
+        solver: CVRP ya configurado.
+        iteraciones: Número máximo de iteraciones, o None.
+        tiempo_limite: Segundos disponibles, o None.
+        max_iteraciones_sin_mejora: Iteraciones seguidas sin mejorar la mejor solución, o None.
+        objetivo: Coste con el que se da por terminada la búsqueda, o None. No basta solo:
+            hace falta también iteraciones, tiempo_limite o max_iteraciones_sin_mejora.
+        eliminaciones: Nombres de ELIMINACIONES entre los que se elige en cada iteración.
+        ordenes: Órdenes de arrepentimiento entre los que se elige (1 = codiciosa).
+        min_eliminados: Mínimo de clientes eliminados por iteración.
+        max_eliminados: Máximo de clientes eliminados por iteración (por defecto, una fracción del total).
+        temperatura_inicial: Por defecto, una fracción del coste medio por cliente.
+        temperatura_final: Por defecto, una fracción de la temperatura inicial.
+        enfriamiento: Nombre de metaheuristicas.ENFRIAMIENTOS o función (inicial, final, avance).
+
+    Returns:
+        Lista de rutas con la mejor solución encontrada (también queda en solver.rutas).
+    """
+    if iteraciones is None and tiempo_limite is None and max_iteraciones_sin_mejora is None:
+        # El objetivo puede no alcanzarse nunca, así que no basta como único criterio
+        raise ValueError("Hace falta iteraciones, tiempo_limite o max_iteraciones_sin_mejora")
+    for nombre in eliminaciones:
+        if nombre not in ELIMINACIONES:
+            raise ValueError(f"Operador de eliminación desconocido: {nombre}")
+    if not callable(enfriamiento):
+        enfriamiento = ENFRIAMIENTOS[enfriamiento]
+    if not solver.rutas:
+        solver.resolver()
+    solver.iniciar_parada(tiempo_limite, objetivo)
+    inicio = time.perf_counter()
+    aleatorio = solver.aleatorio
+    num_clientes = solver.num_clientes - 1
+    if max_eliminados is None:
+        max_eliminados = min(MAX_ELIMINADOS, max(2 * min_eliminados, int(FRACCION_ELIMINADOS * num_clientes)))
+    max_eliminados = min(max_eliminados, num_clientes)
+    min_eliminados = min(min_eliminados, max_eliminados)
+
+    coste_actual = solver.coste_total()
+    mejor_coste = coste_actual
+    mejores_rutas = [ruta.copia() for ruta in solver.rutas]
+    if temperatura_inicial is None:
+        temperatura_inicial = FRACCION_TEMPERATURA_INICIAL * coste_actual / max(num_clientes, 1)
+    if temperatura_final is None:
+        temperatura_final = FRACCION_TEMPERATURA_FINAL * temperatura_inicial
+
+    diario = []
+    for ruta in solver.rutas:
+        ruta.diario = diario
+    visitadas = {solver.huella()}
+    iteracion = 0
+    sin_mejora = 0
+    while True:
+        motivo = None
+        if objetivo is not None and mejor_coste <= objetivo:
+            motivo = MOTIVO_OBJETIVO
+        elif iteraciones is not None and iteracion >= iteraciones:
+            motivo = MOTIVO_ITERACIONES
+        elif max_iteraciones_sin_mejora is not None and sin_mejora >= max_iteraciones_sin_mejora:
+            motivo = MOTIVO_SIN_MEJORA
+        elif solver.debe_parar():
+            motivo = solver.motivo_parada
+        if motivo is not None:
+            break
+        iteracion += 1
+        solver.iteracion = iteracion
+
+        rutas_anteriores = solver.rutas.copy()
+        eliminar = ELIMINACIONES[aleatorio.choice(eliminaciones)]
+        clientes = eliminar(solver, aleatorio.randint(min_eliminados, max_eliminados), aleatorio)
+        tocadas = quitar_clientes(solver, clientes)
+        tocadas += insertar_clientes(solver, clientes, aleatorio.choice(ordenes), diario)
+        solver.mejorar_rutas_localmente(tocadas)
+        solver.eliminar_rutas_vacias()
+        coste = solver.coste_total()
+
+        if tiempo_limite is not None:
+            avance = min((time.perf_counter() - inicio) / max(tiempo_limite, EPSILON), 1.0)
+        elif iteraciones is not None:
+            avance = min(iteracion / iteraciones, 1.0)
+        else:
+            avance = 0.0
+        temperatura = enfriamiento(temperatura_inicial, temperatura_final, avance)
+        delta = coste - coste_actual
+        aceptada = delta <= EPSILON or (temperatura > 0 and aleatorio.random() < math.exp(-delta / temperatura))
+        if aceptada:
+            aceptada = nueva_visita(solver, visitadas) or delta < -EPSILON
+        if aceptada:
+            diario.clear()
+            coste_actual = coste
+        else:
+            deshacer_cambios(diario)
+            solver.rutas = rutas_anteriores
+
+        if coste_actual < mejor_coste - EPSILON:
+            mejor_coste = coste_actual
+            mejores_rutas = [ruta.copia() for ruta in solver.rutas]
+            solver.anotar_incumbente(mejor_coste, "lns")
+            sin_mejora = 0
+        else:
+            sin_mejora += 1
+
+    for ruta in solver.rutas:
+        ruta.diario = None
+    if solver.coste_total() > mejor_coste:
+        solver.rutas = mejores_rutas
+    solver.finalizar_parada()
+    solver.motivo_parada = motivo
+    return solver.rutas
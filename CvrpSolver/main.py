@@ -1,28 +1,130 @@
+import time
+
 from cvrp_instance import read_cvrp_instance
-from cvrp import CVRP
+from cvrp import CVRP, CONSTRUCCION_VECINO_ALEATORIO
+from distance_cache import DEFAULT_CACHE_DIR
+from metaheuristicas import busqueda_local_iterada
+from multiarranque import ejecutar_en_paralelo, semillas_arranques
+from ruta import Ruta
+from solution_cache import DEFAULT_MAX_BYTES, load_solution, solution_key, store_solution
+
+# Iteraciones sin mejora de la búsqueda local iterada que parte de una solución de la caché
+ITERACIONES_SIN_MEJORA_CACHE = 50
 
-def resolver_cvrp(cvrp_instance):
+def resolver_cvrp(cvrp_instance, cache_dir=None, cache_max_bytes=DEFAULT_MAX_BYTES):
+    # Con cache_dir, la solución se busca y se guarda en la caché de soluciones (ver solution_cache)
+    clave = None
+    if cache_dir is not None:
+        clave = solution_key(cvrp_instance, {"metodo": "resolver_cvrp"})
+        solucion = load_solution(clave, cache_dir)
+        if solucion is not None:
+            return _resultado(cvrp_instance, solucion["routes"])
     cvrp_solver = CVRP(cvrp_instance.distance_matrix, list(cvrp_instance.demands.values()), cvrp_instance.capacity)
     cvrp_solver.resolver()
     rutas = cvrp_solver.rutas
-    distancia_total = sum(cvrp_solver.calcular_distancia(ruta) for ruta in rutas)
-    cargas = [sum(cvrp_instance.demands[nodo] for nodo in ruta if nodo != 0) for ruta in rutas]
-    distancias = [cvrp_solver.calcular_distancia(ruta) for ruta in rutas]
-    return rutas, distancias, cargas, distancia_total
+    distancia_total = sum(ruta.distancia for ruta in rutas)
+    cargas = [ruta.carga for ruta in rutas]
+    distancias = [ruta.distancia for ruta in rutas]
+    resultado = rutas, distancias, cargas, distancia_total
+    if clave is not None:
+        _guardar_en_cache(clave, resultado, cache_dir, cache_max_bytes)
+    return resultado
+
+def _resultado(cvrp_instance, rutas):
+    # Rutas como listas de nodos -> (rutas, distancias, cargas, distancia total)
+    demandas = list(cvrp_instance.demands.values())
+    rutas = [Ruta(nodos, cvrp_instance.distance_matrix, demandas) for nodos in rutas]
+    distancias = [ruta.distancia for ruta in rutas]
+    return rutas, distancias, [ruta.carga for ruta in rutas], sum(distancias)
+
+def _guardar_en_cache(clave, resultado, cache_dir, cache_max_bytes):
+    rutas, distancias, cargas, distancia_total = resultado
+    store_solution(clave, [ruta.nodos for ruta in rutas],
+                   {"distances": [float(d) for d in distancias], "loads": [int(c) for c in cargas],
+                    "total_distance": float(distancia_total)},
+                   cache_dir, cache_max_bytes)
 
 # Función principal para ejecutar múltiples veces y obtener los mejores resultados
-def ejecutar_multiple_veces(cvrp_instance, n):
+def ejecutar_multiple_veces(cvrp_instance, n, k_vecinos=None, construccion=CONSTRUCCION_VECINO_ALEATORIO,
+                            procesos=None, semilla=None, tiempo_limite=None, max_pasadas_sin_mejora=None,
+                            objetivo=None, traza=None, cache_dir=None, cache_max_bytes=DEFAULT_MAX_BYTES,
+                            mejorar_cache=False):
+    # Con cache_dir, el resultado se guarda en una caché en disco indexada por la instancia, estos
+    # parámetros y la semilla (ver solution_cache). Si ya estaba, se devuelve sin resolver o, con
+    # mejorar_cache, se usa como solución inicial de una búsqueda local iterada con los mismos límites,
+    # y el resultado sustituye al de la caché si es mejor. procesos no forma parte de la clave:
+    # con semilla el resultado no depende de él.
+    if cache_dir is None:
+        return _ejecutar_multiple_veces(cvrp_instance, n, k_vecinos, construccion, procesos, semilla,
+                                        tiempo_limite, max_pasadas_sin_mejora, objetivo, traza)
+    clave = solution_key(cvrp_instance, {"metodo": "ejecutar_multiple_veces", "n": n, "k_vecinos": k_vecinos,
+                                         "construccion": construccion, "semilla": semilla,
+                                         "tiempo_limite": tiempo_limite,
+                                         "max_pasadas_sin_mejora": max_pasadas_sin_mejora, "objetivo": objetivo})
+    solucion = load_solution(clave, cache_dir)
+    if solucion is None:
+        resultado = _ejecutar_multiple_veces(cvrp_instance, n, k_vecinos, construccion, procesos, semilla,
+                                             tiempo_limite, max_pasadas_sin_mejora, objetivo, traza)
+        _guardar_en_cache(clave, resultado, cache_dir, cache_max_bytes)
+        return resultado
+    if not mejorar_cache:
+        return _resultado(cvrp_instance, solucion["routes"])
+
+    cvrp_solver = CVRP(cvrp_instance.distance_matrix, list(cvrp_instance.demands.values()), cvrp_instance.capacity,
+                       k_vecinos=k_vecinos, construccion=construccion, coordenadas=cvrp_instance.coords,
+                       semilla=semilla, traza=traza)
+    cvrp_solver.rutas = [cvrp_solver.nueva_ruta(nodos) for nodos in solucion["routes"]]
+    busqueda_local_iterada(cvrp_solver, tiempo_limite=tiempo_limite,
+                           max_iteraciones_sin_mejora=ITERACIONES_SIN_MEJORA_CACHE, objetivo=objetivo)
+    resultado = _resultado(cvrp_instance, [ruta.nodos for ruta in cvrp_solver.rutas])
+    if resultado[3] < solucion["metrics"]["total_distance"]:
+        _guardar_en_cache(clave, resultado, cache_dir, cache_max_bytes)
+    return resultado
+
+def _ejecutar_multiple_veces(cvrp_instance, n, k_vecinos, construccion, procesos, semilla, tiempo_limite,
+                             max_pasadas_sin_mejora, objetivo, traza):
+    # Con semilla, cada ejecución usa su propia semilla derivada y el resultado es reproducible
+    # (el mismo en secuencial que con cualquier número de procesos).
+    # tiempo_limite (segundos) es para el conjunto de ejecuciones; max_pasadas_sin_mejora y
+    # objetivo se aplican a cada ejecución (ver CVRP.resolver).
+    # Con traza (traza.TrazaConvergencia) se anotan las mejoras de la mejor solución global,
+    # indicando en cada línea el arranque que la encontró; sólo en secuencial.
+    demandas = list(cvrp_instance.demands.values())
+    if procesos is not None and procesos > 1:
+        if traza is not None:
+            raise ValueError("La traza de convergencia sólo está disponible en ejecución secuencial")
+        rutas, _ = ejecutar_en_paralelo(cvrp_instance.distance_matrix, demandas, cvrp_instance.capacity, n,
+                                        procesos=procesos, semilla=semilla, tiempo_limite=tiempo_limite,
+                                        max_pasadas_sin_mejora=max_pasadas_sin_mejora, objetivo=objetivo,
+                                        k_vecinos=k_vecinos,
+                                        construccion=construccion, coordenadas=cvrp_instance.coords)
+        return _resultado(cvrp_instance, rutas)
+
     mejor_rutas = None
     mejor_distancias = None
     mejor_cargas = None
     menor_distancia_total = float('inf')
+    # Un solo solver para todas las ejecuciones: las listas de vecinos se calculan una vez
+    cvrp_solver = CVRP(cvrp_instance.distance_matrix, demandas, cvrp_instance.capacity,
+                       k_vecinos=k_vecinos, construccion=construccion, coordenadas=cvrp_instance.coords,
+                       semilla=None if semilla is None else 0, traza=traza)
+    semillas = [None] * n if semilla is None else semillas_arranques(semilla, n)
+    plazo = None if tiempo_limite is None else time.perf_counter() + tiempo_limite
+    # Huellas de las soluciones iniciales: un arranque que repite una no se vuelve a mejorar
+    vistas = set()
 
-    for _ in range(n):
-
-        cvrp_solver = CVRP(cvrp_instance.distance_matrix, list(cvrp_instance.demands.values()), cvrp_instance.capacity)
-        rutas = cvrp_solver.resolver()
-        distancias = [cvrp_solver.calcular_distancia(ruta) for ruta in rutas]
-        cargas = [sum(cvrp_instance.demands[nodo] for nodo in ruta[1:-1]) for ruta in rutas]
+    for arranque, semilla_ejecucion in enumerate(semillas):
+        restante = None if plazo is None else max(plazo - time.perf_counter(), 0)
+        if mejor_rutas is not None and (restante == 0 or (objetivo is not None and menor_distancia_total <= objetivo)):
+            break
+        if semilla_ejecucion is not None:
+            cvrp_solver.aleatorio.seed(semilla_ejecucion)
+        if traza is not None:
+            traza.arranque = arranque
+        rutas = cvrp_solver.resolver(tiempo_limite=restante, max_pasadas_sin_mejora=max_pasadas_sin_mejora,
+                                     objetivo=objetivo, vistas=vistas)
+        distancias = [ruta.distancia for ruta in rutas]
+        cargas = [ruta.carga for ruta in rutas]
         distancia_total = sum(distancias)
 
         if distancia_total < menor_distancia_total:
@@ -36,7 +138,7 @@ def ejecutar_multiple_veces(cvrp_instance, n):
 
 if __name__ == "__main__":
     file_path = "instances/A-n32-k5.txt"
-    cvrp_instance = read_cvrp_instance(file_path)
+    cvrp_instance = read_cvrp_instance(file_path, cache_dir=DEFAULT_CACHE_DIR)
     # print("Matriz de distancia:")
     # for row in cvrp_instance.distance_matrix:
     #     print(row)
@@ -0,0 +1,222 @@
+import math
+import time
+
+from cvrp import EPSILON, MOTIVO_ITERACIONES, MOTIVO_OBJETIVO, MOTIVO_SIN_MEJORA
+from ruta import deshacer_cambios
+
+# Clientes que se recolocan al azar en cada perturbación
+FUERZA_PERTURBACION = 8
+# Temperatura inicial por defecto, como fracción del coste medio por cliente de la solución inicial
+FRACCION_TEMPERATURA_INICIAL = 0.1
+# Temperatura final por defecto, como fracción de la inicial
+FRACCION_TEMPERATURA_FINAL = 0.01
+# Huellas de soluciones aceptadas que se recuerdan como mucho (al llegar aquí se olvidan todas)
+MAX_VISITADAS = 100000
+
+ENFRIAMIENTO_GEOMETRICO = "geometrico"
+ENFRIAMIENTO_LINEAL = "lineal"
+
+# Temperatura según el avance (de 0 a 1) entre la temperatura inicial y la final
+ENFRIAMIENTOS = {
+    ENFRIAMIENTO_GEOMETRICO: lambda inicial, final, avance: inicial * (final / inicial) ** avance,
+    ENFRIAMIENTO_LINEAL: lambda inicial, final, avance: inicial + (final - inicial) * avance,
+}
+
+
+def descenso(solver):
+    """
+    Aplica los operadores de búsqueda local de solver hasta que una pasada no mejora.
+
+    Returns:
+        Coste de la solución alcanzada.
+    """
+    coste = solver.coste_total()
+    while not solver.debe_parar():
+        solver.aplicar_operador(solver.mejorar_rutas_localmente)
+        solver.mejorar_entre_rutas()
+        nuevo_coste = solver.coste_total()
+        if nuevo_coste >= coste - EPSILON:
+            return nuevo_coste
+        coste = nuevo_coste
+    return solver.coste_total()
+
+
+def perturbar(solver, fuerza=FUERZA_PERTURBACION):
+    # Recoloca fuerza clientes al azar junto a uno de sus candidatos de otra ruta, respetando la capacidad
+    aleatorio = solver.aleatorio
+    ruta_de = solver.indexar_rutas()
+    for _ in range(fuerza):
+        u = aleatorio.randrange(2, solver.num_clientes + 1)
+        candidatos = solver.candidatos(u)
+        if not candidatos:
+            continue
+        v = aleatorio.choice(candidatos)
+        ruta_u, ruta_v = ruta_de[u], ruta_de.get(v)
+        if (ruta_v is None or ruta_v is ruta_u
+                or ruta_v.carga + solver.demandas[u - 1] > solver.capacidad_vehiculo):
+            continue
+        ruta_u.eliminar(ruta_u.nodos.index(u))
+        ruta_v.insertar(ruta_v.nodos.index(v) + aleatorio.randrange(2), u)
+        ruta_de[u] = ruta_v
+    solver.eliminar_rutas_vacias()
+
+
+def busqueda_local_iterada(solver, iteraciones=None, tiempo_limite=None, max_iteraciones_sin_mejora=None,
+                           objetivo=None, fuerza=FUERZA_PERTURBACION):
+    """
+    Búsqueda local iterada: perturba la solución actual, aplica el descenso y se
+    queda con el resultado sólo si no empeora.
+
+    Continúa desde solver.rutas (si está vacío, resuelve primero con resolver).
+    Los argumentos son los mismos que en recocido_simulado.
+
+    Returns:
+        Lista de rutas con la mejor solución encontrada (también queda en solver.rutas).
+    """
+    return _iterar(solver, None, iteraciones, tiempo_limite, max_iteraciones_sin_mejora, objetivo, fuerza)
+
+
+def recocido_simulado(solver, iteraciones=None, tiempo_limite=None, max_iteraciones_sin_mejora=None,
+                      objetivo=None, fuerza=FUERZA_PERTURBACION, temperatura_inicial=None,
+                      temperatura_final=None, enfriamiento=ENFRIAMIENTO_GEOMETRICO):
+    """
+    Recocido simulado sobre la misma perturbación y descenso que la búsqueda
+    local iterada: una solución que empeora el coste en delta se acepta con
+    probabilidad exp(-delta / T).
+
+    La temperatura baja de temperatura_inicial a temperatura_final según el avance
+    en tiempo (si hay tiempo_limite) o en iteraciones.
+
+    Cada iteración anota en un diario los movimientos que hace sobre las rutas. Si
+    la solución se rechaza, se deshacen esos movimientos en orden inverso, sin
+    copiar la solución completa; sólo se copia al encontrar una nueva mejor.
+
+    Args:
+        solver: CVRP ya configurado; se continúa desde solver.rutas.
+        iteraciones: Número máximo de iteraciones, o None.
+        tiempo_limite: Segundos disponibles, o None.
+        max_iteraciones_sin_mejora: Iteraciones seguidas sin mejorar la mejor solución, o None.
+        objetivo: Coste con el que se da por terminada la búsqueda, o None. No basta solo:
+            hace falta también iteraciones, tiempo_limite o max_iteraciones_sin_mejora.
+        fuerza: Clientes recolocados en cada perturbación.
+        temperatura_inicial: Por defecto, una fracción del coste medio por cliente.
+        temperatura_final: Por defecto, una fracción de la temperatura inicial.
+        enfriamiento: Nombre de ENFRIAMIENTOS o función (inicial, final, avance) -> temperatura.
+
+    Returns:
+        Lista de rutas con la mejor solución encontrada (también queda en solver.rutas).
+    """
+    if tiempo_limite is None and iteraciones is None:
+        raise ValueError("El recocido simulado necesita un número de iteraciones o un tiempo límite")
+    if not callable(enfriamiento):
+        if enfriamiento not in ENFRIAMIENTOS:
+            raise ValueError(f"Esquema de enfriamiento desconocido: {enfriamiento}")
+        enfriamiento = ENFRIAMIENTOS[enfriamiento]
+    temperaturas = (temperatura_inicial, temperatura_final, enfriamiento)
+    return _iterar(solver, temperaturas, iteraciones, tiempo_limite, max_iteraciones_sin_mejora, objetivo, fuerza)
+
+
+def nueva_visita(solver, visitadas):
+    """
+    Anota la huella de la solución actual del solver en visitadas.
+
+    Volver sin mejorar a una solución ya aceptada sólo hace ciclar la búsqueda,
+    así que los métodos que aceptan movimientos que no mejoran la rechazan si
+    esta función devuelve False. La comprobación es O(1) con la huella (ver
+    CVRP.huella), sin copiar ni comparar soluciones.
+
+    Returns:
+        False si la solución ya estaba en visitadas.
+    """
+    huella = solver.huella()
+    if huella in visitadas:
+        return False
+    if len(visitadas) >= MAX_VISITADAS:
+        visitadas.clear()
+    visitadas.add(huella)
+    return True
+
+
+def _iterar(solver, temperaturas, iteraciones, tiempo_limite, max_iteraciones_sin_mejora, objetivo, fuerza):
+    if iteraciones is None and tiempo_limite is None and max_iteraciones_sin_mejora is None:
+        # El objetivo puede no alcanzarse nunca, así que no basta como único criterio
+        raise ValueError("Hace falta iteraciones, tiempo_limite o max_iteraciones_sin_mejora")
+    inicio = time.perf_counter()
+    if not solver.rutas:
+        solver.resolver(tiempo_limite=tiempo_limite, objetivo=objetivo)
+    restante = None if tiempo_limite is None else max(tiempo_limite - (time.perf_counter() - inicio), 0)
+    solver.iniciar_parada(restante, objetivo)
+    inicio = time.perf_counter()
+
+    coste_actual = solver.coste_total()
+    mejor_coste = coste_actual
+    mejores_rutas = [ruta.copia() for ruta in solver.rutas]
+    if temperaturas is not None:
+        temperatura_inicial, temperatura_final, enfriamiento = temperaturas
+        if temperatura_inicial is None:
+            temperatura_inicial = FRACCION_TEMPERATURA_INICIAL * coste_actual / max(solver.num_clientes - 1, 1)
+        if temperatura_final is None:
+            temperatura_final = FRACCION_TEMPERATURA_FINAL * temperatura_inicial
+
+    diario = []
+    for ruta in solver.rutas:
+        ruta.diario = diario
+    visitadas = {solver.huella()}
+    aleatorio = solver.aleatorio
+    iteracion = 0
+    sin_mejora = 0
+    while True:
+        motivo = None
+        if objetivo is not None and mejor_coste <= objetivo:
+            motivo = MOTIVO_OBJETIVO
+        elif iteraciones is not None and iteracion >= iteraciones:
+            motivo = MOTIVO_ITERACIONES
+        elif max_iteraciones_sin_mejora is not None and sin_mejora >= max_iteraciones_sin_mejora:
+            motivo = MOTIVO_SIN_MEJORA
+        elif solver.debe_parar():
+            motivo = solver.motivo_parada
+        if motivo is not None:
+            break
+
+        iteracion += 1
+        solver.iteracion = iteracion
+        rutas_anteriores = solver.rutas.copy()  # Copia superficial: las rutas vacías se quitan de la lista
+        perturbar(solver, fuerza)
+        coste = descenso(solver)
+
+        if temperaturas is None:
+            aceptada = coste <= coste_actual + EPSILON
+        else:
+            if tiempo_limite is not None:
+                avance = min((time.perf_counter() - inicio) / max(restante, EPSILON), 1.0)
+            else:
+                avance = min(iteracion / iteraciones, 1.0)
+            temperatura = enfriamiento(temperatura_inicial, temperatura_final, avance)
+            delta = coste - coste_actual
+            aceptada = delta <= EPSILON or (temperatura > 0
+                                            and aleatorio.random() < math.exp(-delta / temperatura))
+
+        if aceptada:
+            aceptada = nueva_visita(solver, visitadas) or coste < coste_actual - EPSILON
+        if aceptada:
+            diario.clear()
+            coste_actual = coste
+        else:
+            deshacer_cambios(diario)
+            solver.rutas = rutas_anteriores
+
+        if coste_actual < mejor_coste - EPSILON:
+            mejor_coste = coste_actual
+            mejores_rutas = [ruta.copia() for ruta in solver.rutas]
+            solver.anotar_incumbente(mejor_coste, "ils" if temperaturas is None else "recocido")
+            sin_mejora = 0
+        else:
+            sin_mejora += 1
+
+    for ruta in solver.rutas:
+        ruta.diario = None
+    if solver.coste_total() > mejor_coste:
+        solver.rutas = mejores_rutas
+    solver.finalizar_parada()
+    solver.motivo_parada = motivo
+    return solver.rutas
@@ -0,0 +1,224 @@
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from construccion import construir_vecino_mas_cercano, listas_vecinos_construccion
+from cvrp import CVRP
+from cvrp_instance import CVRPInstance, read_cvrp_instance
+from distance_matrix import build_distance_matrix
+
+TAMANOS = (32, 200, 1000, 5000)
+SEMILLA = 12345
+CAPACIDAD = 150  # unos 10 clientes por ruta con demandas entre 1 y 30
+K_VECINOS = 10
+# Cada kernel se repite hasta sumar este tiempo (y al menos MIN_REPETICIONES veces)
+TIEMPO_MINIMO = 0.2
+MIN_REPETICIONES = 3
+MAX_REPETICIONES = 100000
+# % de empeoramiento de ns/op que se tolera frente a la referencia
+UMBRAL_REGRESION = 25.0
+REFERENCIA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "microbenchmarks_baseline.json")
+
+
+class Datos:
+    """
+    Entrada fija de los kernels para un tamaño: coordenadas y demandas generadas con
+    una semilla, su matriz de distancias, rutas iniciales por vecino más cercano y
+    el texto de la instancia en formato CVRPLIB.
+    """
+
+    def __init__(self, tamano, semilla=SEMILLA):
+        generador = np.random.default_rng(semilla + tamano)
+        self.tamano = tamano
+        self.coordenadas = np.round(generador.random((tamano, 2)) * 1000)
+        self.demandas = [0] + generador.integers(1, 31, tamano - 1).tolist()
+        self.distancias = build_distance_matrix(self.coordenadas, "EUC_2D")
+        vecinos = listas_vecinos_construccion(self.distancias)
+        self.rutas = construir_vecino_mas_cercano(self.distancias, self.demandas, CAPACIDAD, vecinos,
+                                                  random.Random(semilla))
+        self.solver = CVRP(self.distancias, self.demandas, CAPACIDAD)
+        self.solver_granular = CVRP(self.distancias, self.demandas, CAPACIDAD, k_vecinos=K_VECINOS)
+        self.texto = self.texto_instancia()
+
+    def texto_instancia(self):
+        lineas = [f"NAME : bench-n{self.tamano}", "COMMENT : microbenchmark", "TYPE : CVRP",
+                  f"DIMENSION : {self.tamano}", "EDGE_WEIGHT_TYPE : EUC_2D", f"CAPACITY : {CAPACIDAD}",
+                  "NODE_COORD_SECTION"]
+        lineas += [f"{i + 1} {int(x)} {int(y)}" for i, (x, y) in enumerate(self.coordenadas)]
+        lineas.append("DEMAND_SECTION")
+        lineas += [f"{i + 1} {demanda}" for i, demanda in enumerate(self.demandas)]
+        lineas += ["DEPOT_SECTION", "1", "-1", "EOF", ""]
+        return "\n".join(lineas)
+
+    def cargar_rutas(self, solver):
+        solver.rutas = [solver.nueva_ruta(nodos) for nodos in self.rutas]
+        return solver
+
+
+# Cada kernel es (preparar, ejecutar, tamaño máximo): preparar(datos) devuelve el argumento de
+# ejecutar y no se mide; así los kernels que modifican su entrada parten siempre del mismo estado.
+
+def _preparar_ruta_larga(datos):
+    return list(range(1, datos.tamano + 1)) + [1]
+
+
+def _preparar_clientes(datos):
+    return list(range(2, datos.tamano + 1))
+
+
+def _preparar_instancia(datos):
+    instancia = CVRPInstance()
+    instancia.edge_weight_type = "EUC_2D"
+    instancia.coords = datos.coordenadas
+    return instancia
+
+
+def _preparar_fichero(datos):
+    fichero = os.path.join(tempfile.gettempdir(), f"cvrp_microbenchmark_n{datos.tamano}.vrp")
+    with open(fichero, "w") as file:
+        file.write(datos.texto)
+    return fichero
+
+
+KERNELS = {
+    "calcular_distancia": (_preparar_ruta_larga, lambda datos, ruta: datos.solver.calcular_distancia(ruta), None),
+    "encontrar_cliente_mas_cercano": (
+        _preparar_clientes, lambda datos, clientes: datos.solver.encontrar_cliente_mas_cercano(1, clientes), None),
+    "mejorar_rutas_localmente": (lambda datos: datos.cargar_rutas(datos.solver),
+                                 lambda datos, solver: solver.mejorar_rutas_localmente(), None),
+    "intercambiar_nodos_entre_rutas": (lambda datos: datos.cargar_rutas(datos.solver),
+                                       lambda datos, solver: solver.intercambiar_nodos_entre_rutas(), 1000),
+    "intercambiar_nodos_entre_rutas_granular": (lambda datos: datos.cargar_rutas(datos.solver_granular),
+                                                lambda datos, solver: solver.intercambiar_nodos_entre_rutas(), None),
+    "fusionar_rutas": (lambda datos: datos.cargar_rutas(datos.solver),
+                       lambda datos, solver: solver.fusionar_rutas(), None),
+    "calculate_distance_matrix": (_preparar_instancia,
+                                  lambda datos, instancia: instancia.calculate_distance_matrix(), None),
+    "read_cvrp_instance": (_preparar_fichero, lambda datos, fichero: read_cvrp_instance(fichero), None),
+}
+
+
+def medir(datos, preparar, ejecutar, tiempo_minimo=TIEMPO_MINIMO):
+    """
+    Mide un kernel: ns por llamada y memoria reservada en una llamada.
+
+    Tras una llamada de calentamiento, se toma el mínimo de las repeticiones (lo
+    más estable frente al ruido de la máquina) y la mediana como referencia. La
+    preparación de cada repetición no entra en la medida. La memoria se mide
+    en una llamada aparte con tracemalloc (que frena la ejecución): pico de bytes
+    reservados y número de bloques que quedan reservados al terminar.
+
+    Returns:
+        Diccionario con ns_per_op, median_ns, repetitions, peak_bytes y allocated_blocks.
+    """
+    ejecutar(datos, preparar(datos))
+    tiempos = []
+    total = 0
+    while (total < tiempo_minimo * 1e9 or len(tiempos) < MIN_REPETICIONES) and len(tiempos) < MAX_REPETICIONES:
+        argumento = preparar(datos)
+        inicio = time.perf_counter_ns()
+        ejecutar(datos, argumento)
+        tiempo = time.perf_counter_ns() - inicio
+        tiempos.append(tiempo)
+        total += tiempo
+
+    argumento = preparar(datos)
+    tracemalloc.start()
+    antes = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    base, _ = tracemalloc.get_traced_memory()
+    resultado = ejecutar(datos, argumento)
+    _, pico = tracemalloc.get_traced_memory()
+    despues = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    del resultado
+    bloques = sum(diferencia.count_diff for diferencia in despues.compare_to(antes, "filename"))
+    return {
+        "ns_per_op": min(tiempos),
+        "median_ns": int(statistics.median(tiempos)),
+        "repetitions": len(tiempos),
+        "peak_bytes": pico - base,
+        "allocated_blocks": bloques,
+    }
+
+
+def ejecutar_microbenchmarks(tamanos=TAMANOS, kernels=None, tiempo_minimo=TIEMPO_MINIMO):
+    """
+    Returns:
+        Diccionario {kernel: {tamaño (como texto): medida}}.
+    """
+    kernels = kernels or list(KERNELS)
+    resultados = {kernel: {} for kernel in kernels}
+    for tamano in tamanos:
+        datos = Datos(tamano)
+        for kernel in kernels:
+            preparar, ejecutar, tamano_maximo = KERNELS[kernel]
+            if tamano_maximo is not None and tamano > tamano_maximo:
+                continue
+            resultados[kernel][str(tamano)] = medir(datos, preparar, ejecutar, tiempo_minimo)
+    return resultados
+
+
+def comparar(resultados, referencia, umbral=UMBRAL_REGRESION):
+    """
+    Returns:
+        Lista de (kernel, tamaño, ns/op de referencia, ns/op actual) de los kernels que empeoran más de umbral %.
+    """
+    regresiones = []
+    for kernel, por_tamano in resultados.items():
+        for tamano, medida in por_tamano.items():
+            anterior = referencia.get(kernel, {}).get(tamano)
+            if anterior is not None and medida["ns_per_op"] > anterior["ns_per_op"] * (1 + umbral / 100.0):
+                regresiones.append((kernel, tamano, anterior["ns_per_op"], medida["ns_per_op"]))
+    return regresiones
+
+
+def imprimir(resultados, referencia=None):
+    print(f"{'Kernel':<42}{'n':>6}{'ns/op':>16}{'Referencia':>16}{'Pico (KiB)':>12}{'Bloques':>10}")
+    for kernel, por_tamano in resultados.items():
+        for tamano, medida in por_tamano.items():
+            anterior = (referencia or {}).get(kernel, {}).get(tamano)
+            columna_referencia = "-" if anterior is None else f"{anterior['ns_per_op']:,}"
+            print(f"{kernel:<42}{tamano:>6}{medida['ns_per_op']:>16,}{columna_referencia:>16}"
+                  f"{medida['peak_bytes'] / 1024:>12.1f}{medida['allocated_blocks']:>10}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Micro-benchmarks de los kernels del solver")
+    parser.add_argument("--tamanos", type=int, nargs="+", default=list(TAMANOS), help="Tamaños de instancia")
+    parser.add_argument("--kernels", nargs="+", choices=list(KERNELS), help="Kernels a medir (por defecto, todos)")
+    parser.add_argument("--tiempo-minimo", type=float, default=TIEMPO_MINIMO, help="Segundos de medida por kernel")
+    parser.add_argument("--referencia", default=REFERENCIA, help="Fichero JSON de referencia")
+    parser.add_argument("--umbral", type=float, default=UMBRAL_REGRESION,
+                        help="%% de empeoramiento de ns/op que se tolera frente a la referencia")
+    parser.add_argument("--guardar-referencia", action="store_true",
+                        help="Guardar las medidas como nueva referencia en lugar de comparar")
+    args = parser.parse_args()
+
+    resultados = ejecutar_microbenchmarks(args.tamanos, args.kernels, args.tiempo_minimo)
+    if args.guardar_referencia:
+        imprimir(resultados)
+        with open(args.referencia, "w") as file:
+            json.dump(resultados, file, indent=2, sort_keys=True)
+            file.write("\n")
+        print(f"\nReferencia guardada en {args.referencia}")
+        sys.exit(0)
+
+    referencia = {}
+    if os.path.exists(args.referencia):
+        with open(args.referencia) as file:
+            referencia = json.load(file)
+    imprimir(resultados, referencia)
+    regresiones = comparar(resultados, referencia, args.umbral)
+    for kernel, tamano, anterior, actual in regresiones:
+        print(f"Regresión: {kernel} (n = {tamano}) {anterior:,} -> {actual:,} ns/op "
+              f"(+{100.0 * (actual - anterior) / anterior:.1f} %)")
+    sys.exit(1 if regresiones else 0)
@@ -0,0 +1,107 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from cvrp import CVRP
+
+# Estado de cada proceso trabajador: memoria compartida abierta y solver creado una sola vez
+_memorias = []
+_solver = None
+_parada = {}
+
+
+def semillas_arranques(semilla, n):
+    """
+    Deriva n semillas independientes (una por arranque) de una semilla base.
+
+    Con la misma semilla base se obtienen las mismas n semillas, tanto en
+    secuencial como en paralelo y con cualquier número de procesos.
+    """
+    return [int(hijo.generate_state(1)[0]) for hijo in np.random.SeedSequence(semilla).spawn(n)]
+
+
+def _compartir(array):
+    memoria = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=memoria.buf)[...] = array
+    return memoria, (memoria.name, array.shape, array.dtype.str)
+
+
+def _abrir(descriptor):
+    nombre, forma, tipo = descriptor
+    memoria = shared_memory.SharedMemory(name=nombre)
+    _memorias.append(memoria)
+    return np.ndarray(forma, dtype=np.dtype(tipo), buffer=memoria.buf)
+
+
+def _inicializar_trabajador(descriptor_distancias, descriptor_demandas, capacidad, opciones_solver, parada):
+    global _solver, _parada
+    distancias = _abrir(descriptor_distancias)
+    demandas = _abrir(descriptor_demandas).tolist()
+    _solver = CVRP(distancias, demandas, capacidad, **opciones_solver)
+    _parada = parada
+
+
+def _resolver_arranque(arranque):
+    indice, semilla = arranque
+    # El plazo es una marca absoluta de time.time() común a todos los procesos. Los arranques que
+    # empiezan fuera de plazo no se ejecutan, salvo el primero para que siempre haya una solución.
+    tiempo_limite = None
+    if _parada.get("plazo") is not None:
+        tiempo_limite = _parada["plazo"] - time.time()
+        if tiempo_limite <= 0:
+            if indice > 0:
+                return None
+            tiempo_limite = 0
+    _solver.aleatorio.seed(semilla)
+    rutas = _solver.resolver(tiempo_limite=tiempo_limite, max_pasadas_sin_mejora=_parada.get("max_pasadas_sin_mejora"),
+                             objetivo=_parada.get("objetivo"))
+    return [list(ruta) for ruta in rutas], sum(ruta.distancia for ruta in rutas)
+
+
+def ejecutar_en_paralelo(distancias, demandas, capacidad, n, procesos=None, semilla=None, tiempo_limite=None,
+                         max_pasadas_sin_mejora=None, objetivo=None, **opciones_solver):
+    """
+    Reparte n arranques de CVRP.resolver() entre varios procesos.
+
+    La matriz de distancias y las demandas se copian una vez a memoria
+    compartida y cada trabajador las abre sin serializarlas. Cada arranque
+    usa su propia semilla (ver semillas_arranques) y sólo vuelven al proceso
+    principal las rutas y el coste de cada arranque.
+
+    Args:
+        distancias: Matriz de distancias densa.
+        demandas: Demanda de cada nodo.
+        capacidad: Capacidad del vehículo.
+        n: Número de arranques.
+        procesos: Número de procesos (por defecto, os.cpu_count()).
+        semilla: Semilla base, o None para una aleatoria.
+        tiempo_limite: Segundos para el conjunto de arranques (incluido el arranque de los procesos), o None.
+        max_pasadas_sin_mejora: Límite de pasadas sin mejora de cada arranque (ver CVRP.resolver).
+        objetivo: Coste objetivo de cada arranque (ver CVRP.resolver).
+        **opciones_solver: Argumentos adicionales para CVRP (k_vecinos, construccion, coordenadas...).
+
+    Returns:
+        Tupla (rutas, coste) del mejor arranque, con las rutas como listas de nodos.
+    """
+    matriz = np.ascontiguousarray(distancias, dtype=np.float64)
+    vector_demandas = np.ascontiguousarray(demandas, dtype=np.int64)
+    opciones_solver = dict(opciones_solver, semilla=0)
+    parada = {"plazo": None if tiempo_limite is None else time.time() + tiempo_limite,
+              "max_pasadas_sin_mejora": max_pasadas_sin_mejora, "objetivo": objetivo}
+    memoria_distancias, descriptor_distancias = _compartir(matriz)
+    memoria_demandas, descriptor_demandas = _compartir(vector_demandas)
+    try:
+        with ProcessPoolExecutor(max_workers=procesos or os.cpu_count(), initializer=_inicializar_trabajador,
+                                 initargs=(descriptor_distancias, descriptor_demandas, capacidad,
+                                           opciones_solver, parada)) as ejecutor:
+            resultados = [resultado for resultado in
+                          ejecutor.map(_resolver_arranque, enumerate(semillas_arranques(semilla, n)))
+                          if resultado is not None]
+    finally:
+        for memoria in (memoria_distancias, memoria_demandas):
+            memoria.close()
+            memoria.unlink()
+    return min(resultados, key=lambda resultado: resultado[1])
@@ -0,0 +1,206 @@
+import numpy as np
+
+from cvrp import MOTIVO_CONVERGENCIA
+from lns import insertar_clientes
+
+# Vecinos por cliente del vecindario granular que se asigna al solver si no tiene uno
+K_VECINOS_REOPTIMIZACION = 20
+
+
+def aplicar_cambios(solver, rutas, eliminados=(), nuevos=(), demandas=None, filas=None):
+    """
+    Aplica al solver un cambio de la instancia y traslada a ella una solución anterior.
+
+    Los nodos del cambio se numeran como en la instancia anterior. Los clientes
+    eliminados se quitan de la matriz y de las demandas y los demás nodos se
+    renumeran de forma consecutiva; los nuevos se añaden al final. Sin clientes
+    nuevos ni eliminados, la matriz se modifica en su sitio si se puede escribir.
+
+    Args:
+        solver: CVRP de la instancia anterior; queda con la instancia nueva.
+        rutas: Solución anterior (rutas o listas de nodos).
+        eliminados: Clientes que dejan de existir.
+        nuevos: Lista de (demanda, fila) de los clientes nuevos. La fila tiene la distancia
+            a cada nodo de la instancia anterior y, a continuación, a cada cliente nuevo.
+        demandas: Diccionario {cliente: demanda nueva}.
+        filas: Diccionario {nodo: fila de distancias nueva a los nodos de la instancia anterior}.
+            Las distancias son simétricas: se actualiza también la columna.
+
+    Returns:
+        Tupla (rutas, afectadas, numeracion): las rutas anteriores como listas de nodos en la
+        numeración nueva y sin los eliminados, los índices de las rutas que contenían algún
+        nodo cambiado, y numeracion[nodo - 1] con el número nuevo de cada nodo (0 si se eliminó).
+    """
+    num_nodos = solver.num_clientes
+    eliminados = set(eliminados)
+    if 1 in eliminados:
+        raise ValueError("No se puede eliminar el depósito")
+    demandas = demandas or {}
+    filas = filas or {}
+    conservados = [i for i in range(num_nodos) if i + 1 not in eliminados]
+    num_conservados = len(conservados)
+    numeracion = [0] * num_nodos
+    for nuevo, i in enumerate(conservados):
+        numeracion[i] = nuevo + 1
+
+    distancias = solver.distancias
+    if eliminados or nuevos or filas:
+        if hasattr(distancias, "pairs"):
+            raise TypeError("Los cambios de distancias necesitan una matriz densa, no un DistanceOracle")
+        anterior = np.asarray(distancias)
+        if eliminados or nuevos:
+            total = num_conservados + len(nuevos)
+            distancias = np.empty((total, total), dtype=anterior.dtype)
+            distancias[:num_conservados, :num_conservados] = anterior[np.ix_(conservados, conservados)]
+        elif anterior is distancias and anterior.flags.writeable:
+            distancias = anterior
+        else:
+            distancias = anterior.copy()
+        for nodo, fila in filas.items():
+            if nodo not in eliminados:
+                fila = np.asarray(fila)[conservados]
+                i = numeracion[nodo - 1] - 1
+                distancias[i, :num_conservados] = fila
+                distancias[:num_conservados, i] = fila
+        for j, (_, fila) in enumerate(nuevos):
+            fila = np.asarray(fila)
+            fila = np.concatenate((fila[conservados], fila[num_nodos:]))
+            distancias[num_conservados + j, :] = fila
+            distancias[:, num_conservados + j] = fila
+
+    nuevas_demandas = list(solver.demandas)
+    for cliente, demanda in demandas.items():
+        nuevas_demandas[cliente - 1] = demanda
+    if eliminados or nuevos:
+        nuevas_demandas = [nuevas_demandas[i] for i in conservados] + [demanda for demanda, _ in nuevos]
+        if solver.coordenadas is not None:
+            # Sin las coordenadas de los clientes nuevos ya no se puede construir por barrido
+            solver.coordenadas = None if nuevos else np.asarray(solver.coordenadas)[conservados]
+
+    cambiados = eliminados | set(demandas) | set(filas)
+    afectadas = []
+    trasladadas = []
+    for r, ruta in enumerate(rutas):
+        nodos = getattr(ruta, "nodos", ruta)
+        if 1 in filas or any(nodo in cambiados for nodo in nodos[1:-1]):
+            afectadas.append(r)
+        trasladadas.append([numeracion[nodo - 1] for nodo in nodos if nodo not in eliminados])
+
+    solver.distancias = distancias
+    solver.demandas = nuevas_demandas
+    solver.num_clientes = len(nuevas_demandas)
+    if eliminados or nuevos or filas:
+        solver.vecinos_construccion = None
+        if solver.vecinos is not None:
+            movidos = {numeracion[nodo - 1] for nodo in filas if nodo != 1 and nodo not in eliminados}
+            movidos.update(range(num_conservados + 1, num_conservados + len(nuevos) + 1))
+            solver.vecinos = _actualizar_vecinos(solver, numeracion, movidos)
+    return trasladadas, afectadas, numeracion
+
+
+def _vecinos_de(distancias, nodo, k):
+    # Los k clientes más cercanos a nodo, ordenados por distancia (como en CVRP.calcular_vecinos)
+    fila = np.array(distancias[nodo - 1], dtype=np.float64)
+    fila[[0, nodo - 1]] = np.inf
+    cercanos = np.argpartition(fila, k - 1)[:k] if k < len(fila) else np.arange(len(fila))
+    cercanos = cercanos[np.argsort(fila[cercanos], kind='stable')][:k]
+    return (cercanos + 1).tolist()
+
+
+def _actualizar_vecinos(solver, numeracion, movidos):
+    # Renumera las listas granulares y sólo recalcula las de los nodos movidos o nuevos, las que
+    # contenían un cliente eliminado o movido y aquellas en las que un nodo movido o nuevo queda
+    # más cerca que el último vecino de la lista.
+    distancias = solver.distancias
+    num_nodos = solver.num_clientes
+    k = min(max(len(lista) for lista in solver.vecinos), num_nodos - 2)
+    vecinos = [[] for _ in range(num_nodos)]
+    recalcular = set(movidos)
+    for viejo, lista in enumerate(solver.vecinos[1:], start=2):
+        nodo = numeracion[viejo - 1]
+        if nodo:
+            lista = [numeracion[vecino - 1] for vecino in lista]
+            vecinos[nodo - 1] = lista
+            if len(lista) != k or 0 in lista or not movidos.isdisjoint(lista):
+                recalcular.add(nodo)
+    if movidos and k > 0:
+        columnas = np.array(sorted(movidos)) - 1
+        ultimos = np.array([lista[-1] - 1 if lista else 0 for lista in vecinos[1:]])
+        ultima_distancia = distancias[np.arange(1, num_nodos), ultimos]
+        cerca = (distancias[1:, columnas] < ultima_distancia[:, None]).any(axis=1)
+        recalcular.update((np.flatnonzero(cerca) + 2).tolist())
+    for nodo in recalcular:
+        vecinos[nodo - 1] = _vecinos_de(distancias, nodo, k) if k > 0 else []
+    return vecinos
+
+
+def reoptimizar(solver, rutas=None, eliminados=(), nuevos=(), demandas=None, filas=None, tiempo_limite=None):
+    """
+    Re-optimiza una solución tras un cambio pequeño de la instancia.
+
+    Aplica el cambio (ver aplicar_cambios), quita de las rutas que se pasan de
+    capacidad los clientes cuya eliminación más ahorra hasta que caben, e inserta
+    estos y los clientes nuevos con la inserción de lns.insertar_clientes. Después
+    mejora sólo la zona afectada: las rutas que han cambiado con 2-opt e intercambio,
+    y los movimientos entre rutas que parten de sus clientes y de los vecinos de
+    éstos. Cada ronda repite la búsqueda sobre las rutas que cambió la anterior
+    hasta que ninguna cambia, así que el trabajo depende del tamaño del cambio y no
+    del de la instancia (salvo las operaciones vectorizadas sobre la matriz).
+
+    Los movimientos entre rutas usan el vecindario granular del solver; si no tiene,
+    se le asignan listas de K_VECINOS_REOPTIMIZACION vecinos.
+
+    Args:
+        solver: CVRP de la instancia anterior; queda con la instancia nueva.
+        rutas: Solución anterior (rutas o listas de nodos), o None para usar solver.rutas.
+        eliminados, nuevos, demandas, filas: Cambio de la instancia (ver aplicar_cambios).
+        tiempo_limite: Segundos disponibles, o None.
+
+    Returns:
+        Tupla (rutas, numeracion): la solución nueva (también queda en solver.rutas) y
+        numeracion[nodo - 1] con el número nuevo de cada nodo anterior (0 si se eliminó).
+    """
+    rutas = solver.rutas if rutas is None else rutas
+    trasladadas, afectadas, numeracion = aplicar_cambios(solver, rutas, eliminados, nuevos, demandas, filas)
+    if solver.vecinos is None:
+        solver.vecinos = solver.calcular_vecinos(K_VECINOS_REOPTIMIZACION)
+    solver.iniciar_parada(tiempo_limite)
+
+    solver.rutas = [solver.nueva_ruta(nodos) for nodos in trasladadas]
+    zona = {id(solver.rutas[r]): solver.rutas[r] for r in afectadas}
+    pendientes = list(range(solver.num_clientes - len(nuevos) + 1, solver.num_clientes + 1))
+    for ruta in zona.values():
+        while ruta.carga > solver.capacidad_vehiculo and len(ruta) > 3:
+            p = min(range(1, len(ruta) - 1), key=lambda p: solver.delta_eliminacion(ruta.nodos, p))
+            pendientes.append(ruta.nodos[p])
+            ruta.eliminar(p)
+    solver.eliminar_rutas_vacias()
+
+    diario = []
+    for ruta in solver.rutas:
+        ruta.diario = diario
+    if pendientes:
+        for ruta in insertar_clientes(solver, pendientes, diario=diario):
+            zona[id(ruta)] = ruta
+
+    zona = [ruta for ruta in zona.values() if len(ruta) > 2]
+    # Índice de la ruta y la posición de cada cliente, construido una sola vez: los operadores entre
+    # rutas lo mantienen y tras la mejora dentro de las rutas se reindexan las rutas del diario
+    indice = solver.indice_rutas()
+    while zona and not solver.debe_parar():
+        diario.clear()
+        solver.aplicar_operador(solver.mejorar_rutas_localmente, zona)
+        for ruta in {id(cambio[0]): cambio[0] for cambio in diario}.values():
+            solver.indexar_ruta(ruta, *indice)
+        clientes = {cliente for ruta in zona for cliente in ruta.nodos[1:-1]}
+        clientes.update(vecino for cliente in list(clientes) for vecino in solver.vecinos[cliente - 1])
+        diario.clear()
+        solver.mejorar_entre_rutas(sorted(clientes), indice)
+        zona = list({id(cambio[0]): cambio[0] for cambio in diario if len(cambio[0]) > 2}.values())
+
+    for ruta in solver.rutas:
+        ruta.diario = None
+    if solver.motivo_parada is None:
+        solver.motivo_parada = MOTIVO_CONVERGENCIA
+    solver.finalizar_parada()
+    return solver.rutas, numeracion
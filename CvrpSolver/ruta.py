@@ -0,0 +1,211 @@
+import random
+from array import array
+
+# Claves aleatorias de 64 bits de cada nodo para la huella de las rutas. Se generan con una semilla
+# fija, así que la huella de una solución es la misma en todos los procesos y ejecuciones.
+SEMILLA_CLAVES = 0x5EED
+MASCARA_HUELLA = (1 << 64) - 1
+_claves = [0]
+_generador_claves = random.Random(SEMILLA_CLAVES)
+
+
+def claves_nodos(num_nodos):
+    # Lista con la clave de cada nodo (indexada desde 1), ampliada si hace falta
+    while len(_claves) <= num_nodos:
+        _claves.append(_generador_claves.getrandbits(64) | 1)
+    return _claves
+
+
+class Ruta:
+    """
+    Ruta de un vehículo: nodos (numerados desde 1, con el depósito en ambos extremos)
+    más la distancia, la carga y sus sumas prefijas por posición, que se mantienen
+    actualizadas al aplicar cada movimiento.
+
+    carga_prefijo[p] es la carga acumulada de nodos[0..p] y distancia_prefijo[p] la
+    distancia recorrida desde nodos[0] hasta nodos[p].
+
+    Si diario es una lista, cada movimiento anota en ella cómo deshacerlo, de modo
+    que deshacer_cambios puede volver atrás sin haber copiado la solución.
+
+    huella es la suma (módulo 2^64) de las claves de las aristas de la ruta, con
+    clave(a, b) = clave(a) * clave(b), de tipo Zobrist. No depende del sentido de
+    recorrido y cada movimiento la actualiza restando las aristas que quita y
+    sumando las que pone, así que dos rutas con las mismas aristas tienen la misma
+    huella sin tener que compararlas nodo a nodo.
+    """
+
+    __slots__ = ("nodos", "distancia", "carga", "carga_prefijo", "distancia_prefijo", "distancias", "demandas",
+                 "diario", "claves", "huella")
+
+    def __init__(self, nodos, distancias, demandas):
+        self.nodos = array("l", nodos)
+        self.distancias = distancias
+        self.demandas = demandas
+        self.diario = None
+        self.claves = claves_nodos(len(distancias))
+        self.carga_prefijo = array("q")
+        self.distancia_prefijo = array("d")
+        self.distancia = 0.0
+        self.carga = 0
+        self.huella = self.huella_aristas(range(len(self.nodos) - 1)) & MASCARA_HUELLA
+        self.actualizar()
+
+    def actualizar(self, desde=0):
+        # Recalcula las sumas prefijas a partir de la posición desde (las anteriores no cambian)
+        nodos = self.nodos
+        num_nodos = len(nodos)
+        carga_prefijo = self.carga_prefijo
+        distancia_prefijo = self.distancia_prefijo
+        if len(carga_prefijo) > num_nodos:
+            del carga_prefijo[num_nodos:]
+            del distancia_prefijo[num_nodos:]
+        elif len(carga_prefijo) < num_nodos:
+            carga_prefijo.extend([0] * (num_nodos - len(carga_prefijo)))
+            distancia_prefijo.extend([0.0] * (num_nodos - len(distancia_prefijo)))
+
+        d = self.distancias
+        demandas = self.demandas
+        if desde <= 0:
+            carga_prefijo[0] = int(demandas[nodos[0] - 1])
+            distancia_prefijo[0] = 0.0
+            desde = 1
+        carga = carga_prefijo[desde - 1]
+        distancia = distancia_prefijo[desde - 1]
+        anterior = nodos[desde - 1] - 1
+        for p in range(desde, num_nodos):
+            actual = nodos[p] - 1
+            carga += int(demandas[actual])
+            distancia += d[anterior][actual]
+            carga_prefijo[p] = carga
+            distancia_prefijo[p] = distancia
+            anterior = actual
+        self.carga = carga
+        self.distancia = distancia
+
+    def carga_tramo(self, i, j):
+        # Carga de nodos[i..j], ambos incluidos
+        return self.carga_prefijo[j] - (self.carga_prefijo[i - 1] if i > 0 else 0)
+
+    def distancia_tramo(self, i, j):
+        # Distancia recorrida entre nodos[i] y nodos[j]
+        return self.distancia_prefijo[j] - self.distancia_prefijo[i]
+
+    def huella_aristas(self, posiciones):
+        # Suma de las claves de las aristas (nodos[p], nodos[p + 1]) para cada p de posiciones
+        nodos = self.nodos
+        claves = self.claves
+        return sum(claves[nodos[p]] * claves[nodos[p + 1]] for p in posiciones)
+
+    def intercambiar(self, i, j):
+        if self.diario is not None:
+            self.diario.append((self, Ruta.intercambiar, (i, j)))
+        nodos = self.nodos
+        aristas = {i - 1, i, j - 1, j}
+        huella = self.huella - self.huella_aristas(aristas)
+        nodos[i], nodos[j] = nodos[j], nodos[i]
+        self.huella = (huella + self.huella_aristas(aristas)) & MASCARA_HUELLA
+        self.actualizar(min(i, j))
+
+    def invertir(self, i, j):
+        # Invierte nodos[i..j] sobre la propia ruta
+        if self.diario is not None:
+            self.diario.append((self, Ruta.invertir, (i, j)))
+        nodos = self.nodos
+        desde = i
+        # Las aristas interiores sólo cambian de sentido: la huella cambia en los dos extremos
+        extremos = (i - 1, j)
+        huella = self.huella - self.huella_aristas(extremos)
+        while i < j:
+            nodos[i], nodos[j] = nodos[j], nodos[i]
+            i += 1
+            j -= 1
+        self.huella = (huella + self.huella_aristas(extremos)) & MASCARA_HUELLA
+        self.actualizar(desde)
+
+    def reemplazar(self, posicion, nodo):
+        if self.diario is not None:
+            self.diario.append((self, Ruta.reemplazar, (posicion, self.nodos[posicion])))
+        aristas = (posicion - 1, posicion)
+        huella = self.huella - self.huella_aristas(aristas)
+        self.nodos[posicion] = nodo
+        self.huella = (huella + self.huella_aristas(aristas)) & MASCARA_HUELLA
+        self.actualizar(posicion)
+
+    def insertar(self, posicion, nodo):
+        if self.diario is not None:
+            self.diario.append((self, Ruta.eliminar, (posicion,)))
+        huella = self.huella - self.huella_aristas((posicion - 1,))
+        self.nodos.insert(posicion, nodo)
+        self.huella = (huella + self.huella_aristas((posicion - 1, posicion))) & MASCARA_HUELLA
+        self.actualizar(posicion)
+
+    def eliminar(self, posicion):
+        huella = self.huella - self.huella_aristas((posicion - 1, posicion))
+        nodo = self.nodos.pop(posicion)
+        if self.diario is not None:
+            self.diario.append((self, Ruta.insertar, (posicion, nodo)))
+        self.huella = (huella + self.huella_aristas((posicion - 1,))) & MASCARA_HUELLA
+        self.actualizar(posicion)
+        return nodo
+
+    def reemplazar_cola(self, posicion, cola):
+        # Sustituye nodos[posicion:] por cola (para 2-opt*)
+        if self.diario is not None:
+            self.diario.append((self, Ruta.reemplazar_cola, (posicion, self.nodos[posicion:])))
+        huella = self.huella - self.huella_aristas(range(posicion - 1, len(self.nodos) - 1))
+        self.nodos[posicion:] = array("l", cola)
+        self.huella = (huella + self.huella_aristas(range(posicion - 1, len(self.nodos) - 1))) & MASCARA_HUELLA
+        self.actualizar(posicion)
+
+    def clientes(self):
+        return self.nodos[1:-1].tolist()
+
+    def copia(self):
+        # Copia los arrays de la ruta pero comparte la matriz de distancias y las demandas
+        ruta = Ruta.__new__(Ruta)
+        ruta.nodos = array("l", self.nodos)
+        ruta.distancias = self.distancias
+        ruta.demandas = self.demandas
+        ruta.diario = None
+        ruta.claves = self.claves
+        ruta.huella = self.huella
+        ruta.carga_prefijo = array("q", self.carga_prefijo)
+        ruta.distancia_prefijo = array("d", self.distancia_prefijo)
+        ruta.distancia = self.distancia
+        ruta.carga = self.carga
+        return ruta
+
+    def __copy__(self):
+        return self.copia()
+
+    def __deepcopy__(self, memo):
+        return self.copia()
+
+    def __len__(self):
+        return len(self.nodos)
+
+    def __iter__(self):
+        return iter(self.nodos)
+
+    def __getitem__(self, indice):
+        if isinstance(indice, slice):
+            return self.nodos[indice].tolist()
+        return self.nodos[indice]
+
+    def __eq__(self, otra):
+        if isinstance(otra, Ruta):
+            return self.nodos == otra.nodos
+        return self.nodos.tolist() == list(otra)
+
+    def __repr__(self):
+        return repr(self.nodos.tolist())
+
+
+def deshacer_cambios(diario):
+    # Deshace en orden inverso los movimientos anotados en diario y lo deja vacío
+    while diario:
+        ruta, movimiento, argumentos = diario.pop()
+        diario_ruta, ruta.diario = ruta.diario, None
+        movimiento(ruta, *argumentos)
+        ruta.diario = diario_ruta
@@ -0,0 +1,126 @@
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+
+# Directorio por defecto de la caché; se puede cambiar con la variable de entorno CVRP_SOLUTION_CACHE.
+DEFAULT_SOLUTION_CACHE_DIR = os.environ.get(
+    "CVRP_SOLUTION_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "cvrp_solver", "solutions")
+)
+# Tamaño máximo de la caché en disco; al superarlo se borran las soluciones usadas hace más tiempo
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def solution_key(instance, config):
+    """
+    Calcula la clave de la caché a partir del contenido de la instancia y de la configuración.
+
+    Args:
+        instance: CVRPInstance. Se usan las coordenadas (o la matriz de distancias si la
+            instancia no tiene coordenadas), el tipo de peso de arista, las demandas, la
+            capacidad y el depósito.
+        config: Diccionario serializable en JSON con la configuración del solver y la semilla.
+
+    Returns:
+        Hash hexadecimal de la instancia y de la configuración.
+    """
+    coords = instance.coords_array()
+    if coords is None:
+        data = np.ascontiguousarray(np.asarray(instance.distance_matrix, dtype=np.float64))
+    else:
+        data = np.ascontiguousarray(coords, dtype=np.float64)
+    demands = np.array([instance.demands[i] for i in sorted(instance.demands)], dtype=np.int64)
+    digest = hashlib.sha256()
+    digest.update(instance.edge_weight_type.encode("utf-8"))
+    digest.update(np.array(data.shape, dtype=np.int64).tobytes())
+    digest.update(data.tobytes())
+    digest.update(np.int64(demands.shape[0]).tobytes())
+    digest.update(demands.tobytes())
+    digest.update(np.array([instance.capacity, instance.depot], dtype=np.int64).tobytes())
+    digest.update(json.dumps(config, sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def load_solution(key, cache_dir=DEFAULT_SOLUTION_CACHE_DIR):
+    """
+    Busca una solución en la caché.
+
+    Un acierto actualiza la fecha de modificación del fichero, que es lo que usa
+    evict_solutions para decidir qué soluciones se usaron hace más tiempo.
+
+    Args:
+        key: Clave calculada con solution_key.
+        cache_dir: Directorio donde se guardan las soluciones.
+
+    Returns:
+        Diccionario con "routes" (listas de nodos) y "metrics", o None si no está en la caché.
+    """
+    path = os.path.join(cache_dir, key + ".json")
+    try:
+        with open(path, encoding="utf-8") as file:
+            solution = json.load(file)
+        os.utime(path)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    return solution
+
+
+def store_solution(key, routes, metrics, cache_dir=DEFAULT_SOLUTION_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+    """
+    Guarda una solución en la caché y, si la caché supera max_bytes, borra las menos usadas.
+
+    Args:
+        key: Clave calculada con solution_key.
+        routes: Lista de rutas como secuencias de nodos (empiezan y terminan en el depósito).
+        metrics: Diccionario serializable en JSON (distancias, cargas, tiempo, ...).
+        cache_dir: Directorio donde se guardan las soluciones.
+        max_bytes: Tamaño máximo de la caché, o None para no limitarlo.
+    """
+    solution = {"routes": [[int(node) for node in route] for route in routes], "metrics": metrics}
+    os.makedirs(cache_dir, exist_ok=True)
+    # Se escribe en un temporal y se renombra, para que ningún proceso lea un fichero a medias
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".json.tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as file:
+            json.dump(solution, file, separators=(",", ":"))
+        os.replace(tmp_path, os.path.join(cache_dir, key + ".json"))
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    if max_bytes is not None:
+        evict_solutions(cache_dir, max_bytes)
+
+
+def evict_solutions(cache_dir=DEFAULT_SOLUTION_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+    """
+    Borra las soluciones usadas hace más tiempo hasta que la caché ocupe como mucho max_bytes.
+
+    Returns:
+        Número de soluciones borradas.
+    """
+    entries = []
+    total = 0
+    with os.scandir(cache_dir) as scan:
+        for entry in scan:
+            if not entry.name.endswith(".json"):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total += stat.st_size
+    entries.sort()
+    removed = 0
+    for _, size, path in entries:
+        if total <= max_bytes:
+            break
+        try:
+            os.unlink(path)
+            removed += 1
+        except FileNotFoundError:
+            pass  # Otro proceso la ha borrado antes
+        total -= size
+    return removed
@@ -0,0 +1,181 @@
+from array import array
+
+from cvrp import EPSILON, MOTIVO_ITERACIONES, MOTIVO_OBJETIVO, MOTIVO_SIN_MEJORA, MOTIVO_SIN_MOVIMIENTOS
+
+# Vecinos por cliente que se usan como lista de candidatos si el solver no tiene vecindario granular
+K_VECINOS_TABU = 15
+# Permanencia tabú mínima; la máxima añade una fracción del número de clientes
+PERMANENCIA_MINIMA = 7
+FRACCION_PERMANENCIA = 0.1
+
+MOVIMIENTO_RELOCALIZAR = 0
+MOVIMIENTO_INTERCAMBIAR = 1
+
+
+def busqueda_tabu(solver, iteraciones=None, tiempo_limite=None, max_iteraciones_sin_mejora=None, objetivo=None,
+                  permanencia=None, clientes_por_iteracion=None):
+    """
+    Búsqueda tabú sobre los vecindarios de relocalización e intercambio entre rutas.
+
+    En cada iteración se aplica el mejor movimiento admisible aunque empeore el
+    coste, y después se mejoran con 2-opt e intercambio las dos rutas tocadas. Al
+    sacar un cliente de una ruta, el atributo (cliente, ruta) queda tabú durante
+    una permanencia aleatoria: volver a meterlo en esa ruta está prohibido salvo
+    que el movimiento mejore la mejor solución conocida (aspiración). Los atributos
+    se guardan en un array plano indexado por cliente * num_rutas + ruta, así que
+    cada comprobación es O(1).
+
+    Los movimientos sólo se prueban entre cada cliente y sus vecinos más cercanos
+    (las listas granulares del solver, o K_VECINOS_TABU si no tiene), y con
+    clientes_por_iteracion sólo sobre una muestra de clientes. Todo el azar sale de
+    solver.aleatorio, de modo que con la misma semilla el resultado es el mismo.
+
+    Si todos los movimientos factibles son tabú, se vacía la lista tabú; si no
+    queda ninguno factible en todo el vecindario, la búsqueda termina con
+    MOTIVO_SIN_MOVIMIENTOS.
+
+    Continúa desde solver.rutas (si está vacío, resuelve primero con resolver).
+
+    Args:
+        solver: CVRP ya configurado.
+        iteraciones: Número máximo de iteraciones, o None.
+        tiempo_limite: Segundos disponibles, o None.
+        max_iteraciones_sin_mejora: Iteraciones seguidas sin mejorar la mejor solución, o None.
+        objetivo: Coste con el que se da por terminada la búsqueda, o None. No basta solo:
+            hace falta también iteraciones, tiempo_limite o max_iteraciones_sin_mejora.
+        permanencia: Tupla (mínima, máxima) de iteraciones tabú, o None para el valor por defecto.
+        clientes_por_iteracion: Clientes de la muestra de cada iteración, o None para todos.
+
+    Returns:
+        Lista de rutas con la mejor solución encontrada (también queda en solver.rutas).
+    """
+    if iteraciones is None and tiempo_limite is None and max_iteraciones_sin_mejora is None:
+        # El objetivo puede no alcanzarse nunca, así que no basta como único criterio
+        raise ValueError("Hace falta iteraciones, tiempo_limite o max_iteraciones_sin_mejora")
+    if not solver.rutas:
+        solver.resolver()
+    solver.iniciar_parada(tiempo_limite, objetivo)
+    aleatorio = solver.aleatorio
+    demandas = solver.demandas
+    capacidad = solver.capacidad_vehiculo
+    num_nodos = solver.num_clientes
+    vecinos = solver.vecinos if solver.vecinos is not None else solver.calcular_vecinos(K_VECINOS_TABU)
+    if permanencia is None:
+        permanencia = (PERMANENCIA_MINIMA, PERMANENCIA_MINIMA + int(FRACCION_PERMANENCIA * num_nodos))
+
+    # Las rutas vacías se conservan durante la búsqueda para que sus índices no cambien
+    rutas = solver.rutas
+    num_rutas = len(rutas)
+    tabu_hasta = array("l", [0]) * ((num_nodos + 1) * num_rutas)
+    ruta_de = [-1] * (num_nodos + 1)  # -1 para el depósito, que no se mueve aunque esté en las listas
+    posicion = [0] * (num_nodos + 1)
+
+    def indexar(r):
+        nodos = rutas[r].nodos
+        for p in range(1, len(nodos) - 1):
+            ruta_de[nodos[p]] = r
+            posicion[nodos[p]] = p
+
+    for r in range(num_rutas):
+        indexar(r)
+
+    coste = solver.coste_total()
+    mejor_coste = coste
+    mejores_rutas = [ruta.copia() for ruta in rutas]
+    clientes = list(range(2, num_nodos + 1))
+    iteracion = 0
+    sin_mejora = 0
+    while True:
+        motivo = None
+        if objetivo is not None and mejor_coste <= objetivo:
+            motivo = MOTIVO_OBJETIVO
+        elif iteraciones is not None and iteracion >= iteraciones:
+            motivo = MOTIVO_ITERACIONES
+        elif max_iteraciones_sin_mejora is not None and sin_mejora >= max_iteraciones_sin_mejora:
+            motivo = MOTIVO_SIN_MEJORA
+        elif solver.debe_parar():
+            motivo = solver.motivo_parada
+        if motivo is not None:
+            break
+        iteracion += 1
+        solver.iteracion = iteracion
+
+        muestra = clientes
+        if clientes_por_iteracion is not None and clientes_por_iteracion < len(clientes):
+            muestra = aleatorio.sample(clientes, clientes_por_iteracion)
+        mejor_delta = float('inf')
+        mejor_movimiento = None
+        bloqueado = False  # Algún movimiento factible se ha descartado por tabú
+        umbral_aspiracion = mejor_coste - coste - EPSILON
+        for u in muestra:
+            ru = ruta_de[u]
+            ruta_u = rutas[ru]
+            pu = posicion[u]
+            demanda_u = demandas[u - 1]
+            eliminacion = solver.delta_eliminacion(ruta_u.nodos, pu)
+            for v in vecinos[u - 1]:
+                rv = ruta_de[v]
+                if rv == ru or rv < 0:
+                    continue
+                ruta_v = rutas[rv]
+                pv = posicion[v]
+                tabu_u = tabu_hasta[u * num_rutas + rv] > iteracion
+                if ruta_v.carga + demanda_u <= capacidad:
+                    for q in (pv, pv + 1):
+                        delta = eliminacion + solver.delta_insercion(ruta_v.nodos, q, u)
+                        if delta < mejor_delta:
+                            if not tabu_u or delta < umbral_aspiracion:
+                                mejor_delta = delta
+                                mejor_movimiento = (MOVIMIENTO_RELOCALIZAR, u, ru, pu, v, rv, q)
+                            else:
+                                bloqueado = True
+                diferencia = demandas[v - 1] - demanda_u
+                if ruta_u.carga + diferencia <= capacidad and ruta_v.carga - diferencia <= capacidad:
+                    delta = solver.delta_reemplazo(ruta_u.nodos, pu, v) + solver.delta_reemplazo(ruta_v.nodos, pv, u)
+                    tabu = tabu_u or tabu_hasta[v * num_rutas + ru] > iteracion
+                    if delta < mejor_delta:
+                        if not tabu or delta < umbral_aspiracion:
+                            mejor_delta = delta
+                            mejor_movimiento = (MOVIMIENTO_INTERCAMBIAR, u, ru, pu, v, rv, pv)
+                        else:
+                            bloqueado = True
+
+        if mejor_movimiento is None:
+            if bloqueado:
+                # Todos los movimientos factibles son tabú: se vacía la lista para poder seguir
+                tabu_hasta = array("l", [0]) * len(tabu_hasta)
+            elif muestra is clientes:
+                # Sin ningún movimiento factible en todo el vecindario, las demás iteraciones
+                # tampoco encontrarían ninguno
+                motivo = MOTIVO_SIN_MOVIMIENTOS
+                break
+            sin_mejora += 1
+            continue
+        tipo, u, ru, pu, v, rv, q = mejor_movimiento
+        ruta_u, ruta_v = rutas[ru], rutas[rv]
+        tabu_hasta[u * num_rutas + ru] = iteracion + aleatorio.randint(*permanencia)
+        if tipo == MOVIMIENTO_RELOCALIZAR:
+            ruta_u.eliminar(pu)
+            ruta_v.insertar(q, u)
+        else:
+            ruta_u.reemplazar(pu, v)
+            ruta_v.reemplazar(q, u)
+            tabu_hasta[v * num_rutas + rv] = iteracion + aleatorio.randint(*permanencia)
+        solver.mejorar_rutas_localmente((ruta_u, ruta_v))
+        indexar(ru)
+        indexar(rv)
+
+        coste = solver.coste_total()
+        if coste < mejor_coste - EPSILON:
+            mejor_coste = coste
+            mejores_rutas = [ruta.copia() for ruta in rutas]
+            solver.anotar_incumbente(mejor_coste, "tabu")
+            sin_mejora = 0
+        else:
+            sin_mejora += 1
+
+    solver.rutas = mejores_rutas
+    solver.eliminar_rutas_vacias()
+    solver.finalizar_parada()
+    solver.motivo_parada = motivo
+    return solver.rutas
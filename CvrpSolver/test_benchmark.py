@@ -0,0 +1,14 @@
+import os
+
+from benchmark import ejecutar_configuracion, load_instance
+from cvrp import MOTIVO_ITERACIONES
+
+INSTANCIA = os.path.join(os.path.dirname(__file__), "instances", "A-n32-k5.txt")
+
+
+def test_configuracion_con_metaheuristica():
+    instance = load_instance(INSTANCIA)
+    resolver = ejecutar_configuracion(instance, 1)
+    ils = ejecutar_configuracion(instance, 1, metodo="ils", iteraciones=5)
+    assert ils["stop_reason"] == MOTIVO_ITERACIONES
+    assert ils["cost"] <= resolver["cost"]
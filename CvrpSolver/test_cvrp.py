@@ -0,0 +1,41 @@
+import numpy as np
+
+from cvrp import CVRP
+from distance_matrix import build_distance_matrix, nearest_neighbors
+
+
+def instancia_aleatoria(semilla, num_nodos=40, capacidad=40):
+    generador = np.random.default_rng(semilla)
+    coordenadas = np.round(generador.random((num_nodos, 2)) * 100)
+    demandas = [0] + generador.integers(1, 11, num_nodos - 1).tolist()
+    return build_distance_matrix(coordenadas, "EUC_2D"), demandas, capacidad
+
+
+def test_vecinos_precalculados_sin_deposito():
+    for semilla in range(40):
+        distancias, demandas, capacidad = instancia_aleatoria(semilla)
+        solver = CVRP(distancias, demandas, capacidad, vecinos=nearest_neighbors(distancias, 8))
+        assert all(1 not in lista for lista in solver.vecinos)
+        assert all(len(lista) == 7 for lista in solver.vecinos[1:])
+
+
+def test_vecinos_precalculados_como_k_vecinos():
+    distancias, demandas, capacidad = instancia_aleatoria(30)
+    precalculados = CVRP(distancias, demandas, capacidad, vecinos=nearest_neighbors(distancias, 9))
+    granular = CVRP(distancias, demandas, capacidad, k_vecinos=8)
+    assert precalculados.vecinos == granular.vecinos
+
+
+def test_indice_compartido_al_dia_tras_mejorar_entre_rutas():
+    for k_vecinos in (8, None):
+        distancias, demandas, capacidad = instancia_aleatoria(12)
+        solver = CVRP(distancias, demandas, capacidad, k_vecinos=k_vecinos)
+        # Rutas de cuatro clientes en el orden de numeración, lejos de un óptimo local
+        solver.rutas = [solver.nueva_ruta([1] + list(range(i, min(i + 4, len(demandas) + 1))) + [1])
+                        for i in range(2, len(demandas) + 1, 4)]
+        indice = solver.indice_rutas()
+        assert solver.mejorar_entre_rutas(indice=indice)
+
+        ruta_de, posicion = solver.indice_rutas()
+        assert all(a is b for a, b in zip(indice[0], ruta_de))
+        assert indice[1] == posicion
@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+from cvrp import CVRP, MOTIVO_SIN_MOVIMIENTOS
+from distance_matrix import build_distance_matrix, nearest_neighbors
+from tabu import busqueda_tabu
+from test_cvrp import instancia_aleatoria
+
+
+@pytest.mark.parametrize("semilla", [6, 27, 30, 46, 51])
+def test_tabu_con_el_deposito_en_las_listas_de_vecinos(semilla):
+    distancias, demandas, capacidad = instancia_aleatoria(semilla)
+    solver = CVRP(distancias, demandas, capacidad, semilla=semilla)
+    solver.resolver()
+    # Listas sin limpiar: el depósito aparece entre los vecinos de los clientes cercanos a él
+    solver.vecinos = [[]] + (nearest_neighbors(distancias, 8)[1:] + 1).tolist()
+    assert any(1 in lista for lista in solver.vecinos)
+    rutas = busqueda_tabu(solver, iteraciones=200)
+
+    clientes = sorted(cliente for ruta in rutas for cliente in ruta.nodos[1:-1])
+    assert clientes == list(range(2, len(demandas) + 1))
+    for ruta in rutas:
+        assert ruta.nodos[0] == 1 and ruta.nodos[-1] == 1
+        assert ruta.carga <= capacidad
+
+
+def test_tabu_sin_movimientos_factibles():
+    distancias = build_distance_matrix(np.array([[0, 0], [10, 0], [0, 10], [-10, 0]]), "EUC_2D")
+    solver = CVRP(distancias, [0, 6, 5, 5], 10)
+    # Ninguna relocalización ni intercambio cabe en las rutas: la búsqueda debe terminar sola
+    solver.rutas = [solver.nueva_ruta([1, 2, 1]), solver.nueva_ruta([1, 3, 4, 1])]
+    rutas = busqueda_tabu(solver, tiempo_limite=5)
+
+    assert solver.motivo_parada == MOTIVO_SIN_MOVIMIENTOS
+    assert solver.iteracion == 1
+    assert [list(ruta) for ruta in rutas] == [[1, 2, 1], [1, 3, 4, 1]]
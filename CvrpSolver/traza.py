@@ -0,0 +1,72 @@
+import json
+import time
+
+# Líneas que se acumulan en memoria antes de escribirlas de una vez
+TAMANO_BUFFER = 256
+
+
+class TrazaConvergencia:
+    """
+    Traza JSONL de la evolución de la mejor solución.
+
+    Cada vez que se encuentra una solución mejor que todas las anteriores de la
+    traza se añade una línea con el tiempo transcurrido desde que se creó la traza
+    (t, segundos), la iteración (it), el coste (obj), el número de rutas (rutas),
+    el operador que la produjo (op) y, si se ha fijado, el arranque (arranque).
+
+    Las líneas se acumulan y se escriben cada tamano_buffer líneas o al cerrar la
+    traza, de modo que registrar no hace E/S en cada mejora.
+
+    Uso:
+        with TrazaConvergencia("traza.jsonl") as traza:
+            CVRP(..., traza=traza).resolver()
+    """
+
+    def __init__(self, destino, tamano_buffer=TAMANO_BUFFER):
+        # destino puede ser una ruta de fichero (se añade al final) o un objeto con write
+        if hasattr(destino, "write"):
+            self.fichero = destino
+            self.propio = False
+        else:
+            self.fichero = open(destino, "a", encoding="utf-8")
+            self.propio = True
+        self.tamano_buffer = tamano_buffer
+        self.buffer = []
+        self.inicio = time.perf_counter()
+        self.mejor_coste = float('inf')
+        self.arranque = None
+
+    def reiniciar_incumbente(self):
+        # Para trazar cada ejecución por separado en lugar de la mejor global
+        self.mejor_coste = float('inf')
+
+    def registrar(self, iteracion, coste, num_rutas, operador):
+        if coste >= self.mejor_coste:
+            return False
+        self.mejor_coste = coste
+        registro = {"t": round(time.perf_counter() - self.inicio, 6), "it": iteracion, "obj": coste,
+                    "rutas": num_rutas, "op": operador}
+        if self.arranque is not None:
+            registro["arranque"] = self.arranque
+        self.buffer.append(json.dumps(registro, separators=(",", ":")))
+        if len(self.buffer) >= self.tamano_buffer:
+            self.vaciar()
+        return True
+
+    def vaciar(self):
+        if self.buffer:
+            self.fichero.write("\n".join(self.buffer) + "\n")
+            self.buffer.clear()
+
+    def cerrar(self):
+        self.vaciar()
+        if self.propio:
+            self.fichero.close()
+        else:
+            self.fichero.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        self.cerrar()
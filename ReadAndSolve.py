@@ -79,13 +79,8 @@ def calculate_distances(node_coords):
     Returns:
         numpy.ndarray: Matriz de distancias euclidianas.
     """
-    distances = np.zeros((len(node_coords), len(node_coords)))
-    for i in range(len(node_coords)):
-        for j in range(i + 1, len(node_coords)):
-            x1, y1 = node_coords[i + 1]
-            x2, y2 = node_coords[j + 1]
-            distances[i, j] = distances[j, i] = np.sqrt((x1 - x2)**2 + (y1 - y2)**2)
-    return distances
+    coords = np.array([node_coords[i + 1] for i in range(len(node_coords))], dtype=np.float64)
+    return np.hypot(coords[:, 0, None] - coords[None, :, 0], coords[:, 1, None] - coords[None, :, 1])
 
 
 class CVRP: